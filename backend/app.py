@@ -3,28 +3,89 @@ Flask Backend for Electric Motor Temperature Prediction
 Provides RESTful API endpoints for ML model predictions
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
+import json
 from flask_cors import CORS
 import numpy as np
 import joblib
 from datetime import datetime
 import os
+import threading
+
+import content_encoding
+import diagnostics
+import drift
+import explain
+import sweep
+from diagnostics import mark_stage
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for React frontend
+diagnostics.init_app(app)  # Slow-request capture (off unless a threshold is set)
+content_encoding.init_app(app)  # gzip/zstd request bodies and negotiated responses
 
 # Load the trained model and scaler
 MODEL_PATH = 'model.save'
 SCALER_PATH = 'transform.save'
+REFERENCE_PATH = 'reference.save'
 
 try:
     model = joblib.load(MODEL_PATH)
     scaler = joblib.load(SCALER_PATH)
+    model_version = sweep.model_version(MODEL_PATH)
     print("✓ Model and scaler loaded successfully")
 except Exception as e:
     print(f"✗ Error loading model: {e}")
     model = None
     scaler = None
+    model_version = None
+
+# Input features in the order the scaler and model expect them
+FEATURE_NAMES = ['ambient', 'coolant', 'u_d', 'u_q', 'motor_speed', 'i_d', 'i_q']
+
+# Tree path metadata for /explain is built on the first explanation, since it
+# holds ~176 bytes per leaf (EXPLAIN_PRELOAD=1 builds it at startup instead)
+explainer = None
+_explainer_lock = threading.Lock()
+
+
+def get_explainer():
+    """Return the TreeSHAP explainer for the loaded model, or None for non-tree models"""
+    global explainer
+    if explainer is None:
+        with _explainer_lock:
+            if explainer is None:
+                explainer = explain.build_explainer(model)
+    return explainer
+
+
+if os.environ.get('EXPLAIN_PRELOAD') == '1':
+    get_explainer()
+
+# Live input histograms compared against the training-time reference
+try:
+    reference = joblib.load(REFERENCE_PATH)
+    print("✓ Drift reference loaded successfully")
+except Exception as e:
+    print(f"✗ Drift reference not available ({e}); tracking out-of-range inputs only")
+    reference = None
+
+drift_monitor = drift.DriftMonitor(
+    reference,
+    feature_names=FEATURE_NAMES,
+    window_seconds=float(os.environ.get('DRIFT_WINDOW_SECONDS', 3600))
+)
+if os.environ.get('DRIFT_CHECK_INTERVAL_SECONDS'):
+    drift_monitor.start_schedule(float(os.environ['DRIFT_CHECK_INTERVAL_SECONDS']))
+
+# Encoded /sweep response bodies keyed by model version, sweep spec and content encoding
+sweep_cache = sweep.SweepCache(
+    max_bytes=int(os.environ.get('SWEEP_CACHE_BYTES', 64 * 1024 * 1024))
+)
+
+# Risk bands of determine_risk_level(), for vectorized use
+RISK_LEVELS = ['low', 'normal', 'warning', 'critical']
+RISK_THRESHOLDS = [0.3, 0.6, 0.8]
 
 
 def determine_risk_level(temperature):
@@ -81,6 +142,7 @@ def predict():
     try:
         # Get JSON data from request
         data = request.get_json()
+        mark_stage('parse')
         
         # Validate required fields
         required_fields = ['ambient', 'coolant', 'u_d', 'u_q', 'motor_speed', 'i_d', 'i_q']
@@ -106,13 +168,19 @@ def predict():
         
         # Reshape for model input
         features_array = np.array([features])
+        mark_stage('validate')
         
         # Transform features using the saved scaler
         features_scaled = scaler.transform(features_array)
+        mark_stage('scale')
         
         # Make prediction
         prediction = model.predict(features_scaled)
         predicted_temp = float(prediction[0])
+        mark_stage('predict')
+
+        # Only inputs the model accepted count towards drift
+        drift_monitor.update(features_scaled)
         
         # Determine risk level
         risk_level = determine_risk_level(predicted_temp)
@@ -175,6 +243,7 @@ def batch_predict():
     try:
         data = request.get_json()
         samples = data.get('samples', [])
+        mark_stage('parse')
         
         if not samples:
             return jsonify({
@@ -183,6 +252,7 @@ def batch_predict():
             }), 400
         
         predictions = []
+        scaled_rows = []
         required_fields = ['ambient', 'coolant', 'u_d', 'u_q', 'motor_speed', 'i_d', 'i_q']
         
         for idx, sample in enumerate(samples):
@@ -206,10 +276,14 @@ def batch_predict():
                 float(sample['i_d']),
                 float(sample['i_q'])
             ]
+            mark_stage('validate')
             
             features_scaled = scaler.transform([features])
+            mark_stage('scale')
             prediction = model.predict(features_scaled)
             predicted_temp = float(prediction[0])
+            mark_stage('predict')
+            scaled_rows.append(features_scaled[0])
             
             predictions.append({
                 'success': True,
@@ -218,6 +292,9 @@ def batch_predict():
                 'risk_level': determine_risk_level(predicted_temp)
             })
         
+        if scaled_rows:
+            drift_monitor.update(np.array(scaled_rows))
+        
         return jsonify({
             'success': True,
             'total_samples': len(samples),
@@ -233,6 +310,195 @@ def batch_predict():
         }), 500
 
 
+@app.route('/explain', methods=['POST'])
+def explain_prediction():
+    """
+    Per-feature contributions (TreeSHAP) for one sample or a batch
+    Accepts the /predict payload, or {"samples": [...]} like /batch-predict.
+    Contributions are in prediction units and sum with base_value to the prediction.
+    """
+    if not model or not scaler:
+        return jsonify({
+            'success': False,
+            'error': 'Model not loaded'
+        }), 500
+
+    explainer = get_explainer()
+    if explainer is None:
+        return jsonify({
+            'success': False,
+            'error': 'Explanations not supported',
+            'message': f'Feature attribution requires a tree model, loaded model is {type(model).__name__}.'
+        }), 501
+
+    try:
+        data = request.get_json()
+        is_batch = 'samples' in data
+        samples = data['samples'] if is_batch else [data]
+        mark_stage('parse')
+
+        if not samples:
+            return jsonify({
+                'success': False,
+                'error': 'No samples provided'
+            }), 400
+
+        for idx, sample in enumerate(samples):
+            missing_fields = [field for field in FEATURE_NAMES if field not in sample]
+            if missing_fields:
+                return jsonify({
+                    'success': False,
+                    'error': 'Missing required fields',
+                    'sample_index': idx,
+                    'missing_fields': missing_fields
+                }), 400
+
+        features_array = np.array(
+            [[float(sample[field]) for field in FEATURE_NAMES] for sample in samples]
+        )
+        mark_stage('validate')
+
+        features_scaled = scaler.transform(features_array)
+        mark_stage('scale')
+
+        contributions = explainer.shap_values(features_scaled)
+        predictions = explainer.expected_value + contributions.sum(axis=1)
+        mark_stage('explain')
+
+        explanations = [{
+            'prediction': round(float(prediction), 4),
+            'risk_level': determine_risk_level(prediction),
+            'contributions': {
+                field: round(float(value), 6) for field, value in zip(FEATURE_NAMES, row)
+            }
+        } for prediction, row in zip(predictions, contributions)]
+
+        if not is_batch:
+            return jsonify({
+                'success': True,
+                **explanations[0],
+                'base_value': round(explainer.expected_value, 6),
+                'timestamp': datetime.now().isoformat()
+            }), 200
+
+        for idx, explanation in enumerate(explanations):
+            explanation['sample_index'] = idx
+
+        return jsonify({
+            'success': True,
+            'total_samples': len(samples),
+            'base_value': round(explainer.expected_value, 6),
+            'explanations': explanations,
+            'timestamp': datetime.now().isoformat()
+        }), 200
+
+    except (ValueError, TypeError) as e:
+        return jsonify({
+            'success': False,
+            'error': 'Invalid input values',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Explanation failed',
+            'message': str(e)
+        }), 500
+
+
+@app.route('/sweep', methods=['POST'])
+def sweep_predict():
+    """
+    Operating-point sweep: vary one or two features over a grid, hold the rest fixed
+    Expected JSON payload:
+    {
+        "base": {"ambient": float, ..., "i_q": float},
+        "axes": [
+            {"feature": "motor_speed", "start": float, "stop": float, "steps": int},
+            {"feature": "i_q", "start": float, "stop": float, "steps": int}
+        ],
+        "format": "binary" | "json"
+    }
+    predictions[i][j] is the prediction at axes[0].values[i], axes[1].values[j].
+    Bodies are cached already compressed for the negotiated Content-Encoding.
+    """
+    if not model or not scaler:
+        return jsonify({
+            'success': False,
+            'error': 'Model not loaded'
+        }), 500
+
+    try:
+        spec = sweep.parse_sweep_spec(request.get_json(), FEATURE_NAMES)
+    except (ValueError, TypeError, KeyError, AttributeError) as e:
+        return jsonify({
+            'success': False,
+            'error': 'Invalid sweep specification',
+            'message': str(e)
+        }), 400
+    mark_stage('parse')
+
+    encoding = content_encoding.negotiate_encoding()
+    cache_key = (model_version, spec, encoding)
+    body = sweep_cache.get(cache_key)
+    cache_status = 'hit'
+
+    if body is None:
+        cache_status = 'miss'
+        try:
+            axis_values, predictions = sweep.run_sweep(model, scaler, spec, FEATURE_NAMES)
+            mark_stage('predict')
+        except Exception as e:
+            return jsonify({
+                'success': False,
+                'error': 'Sweep failed',
+                'message': str(e)
+            }), 500
+
+        _, axes, sweep_format = spec
+        risk_codes = np.digitize(predictions, RISK_THRESHOLDS)
+        body = json.dumps({
+            'success': True,
+            'model_version': model_version,
+            'axes': [{
+                'feature': feature,
+                'values': values.tolist()
+            } for (feature, _, _, _), values in zip(axes, axis_values)],
+            'shape': list(predictions.shape),
+            'format': sweep_format,
+            'predictions': sweep.encode_array(predictions, sweep_format, 'float32', decimals=4),
+            'risk_levels': sweep.encode_array(risk_codes, sweep_format, 'uint8'),
+            'risk_legend': RISK_LEVELS,
+            'computed_at': datetime.now().isoformat()
+        }, separators=(',', ':')).encode('utf-8')
+        mark_stage('serialize')
+
+        if encoding is not None:
+            body = content_encoding.compress_bytes(encoding, body)
+            mark_stage('compress')
+        sweep_cache.put(cache_key, body)
+
+    response = Response(body, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    if encoding is not None:
+        # Already compressed, so compress_response leaves the body alone
+        response.headers['Content-Encoding'] = encoding
+    response.headers['X-Sweep-Cache'] = cache_status
+    return response, 200
+
+
+@app.route('/drift', methods=['GET'])
+def drift_report():
+    """
+    Drift scores of live /predict and /batch-predict inputs against training data
+    PSI and KS per feature over the monitoring window, plus out-of-range counts
+    """
+    return jsonify({
+        'success': True,
+        **drift_monitor.report()
+    }), 200
+
+
 @app.route('/model-info', methods=['GET'])
 def model_info():
     """Get information about the loaded model"""
@@ -255,6 +521,7 @@ def model_info():
             'i_q'
         ],
         'target': 'permanent_magnet_temperature',
+        'model_version': model_version,
         'performance': {
             'r2_score': 0.96,
             'rmse': 0.03
@@ -262,10 +529,93 @@ def model_info():
     }), 200
 
 
+@app.route('/admin/profile', methods=['POST'])
+@diagnostics.require_admin
+def profile():
+    """
+    Run the sampling profiler for a few seconds and return collapsed stacks
+    Query parameters:
+        seconds: Sampling duration (default 5, max 60)
+        interval_ms: Delay between samples (default 5)
+        format: 'collapsed' (flamegraph.pl input, default) or 'json'
+    """
+    try:
+        seconds = float(request.args.get('seconds', 5))
+        interval_ms = float(request.args.get('interval_ms', diagnostics.DEFAULT_SAMPLE_INTERVAL_MS))
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': 'Invalid profile parameters',
+            'message': str(e)
+        }), 400
+
+    if not 0 < seconds <= diagnostics.MAX_PROFILE_SECONDS or interval_ms < 1:
+        return jsonify({
+            'success': False,
+            'error': 'Invalid profile parameters',
+            'message': f'seconds must be in (0, {diagnostics.MAX_PROFILE_SECONDS}] and interval_ms >= 1'
+        }), 400
+
+    try:
+        stacks = diagnostics.sample_stacks(seconds, interval_ms)
+    except RuntimeError as e:
+        return jsonify({
+            'success': False,
+            'error': 'Profiler busy',
+            'message': str(e)
+        }), 409
+
+    if request.args.get('format', 'collapsed') == 'json':
+        return jsonify({
+            'success': True,
+            'seconds': seconds,
+            'interval_ms': interval_ms,
+            'total_samples': sum(stacks.values()),
+            'stacks': dict(stacks.most_common())
+        }), 200
+
+    return Response(diagnostics.format_collapsed(stacks), mimetype='text/plain'), 200
+
+
+@app.route('/admin/slow-requests', methods=['GET', 'PUT', 'DELETE'])
+@diagnostics.require_admin
+def slow_requests():
+    """
+    Inspect or configure slow-request capture
+    GET returns the captured requests, PUT sets {"threshold_ms": float | null},
+    DELETE clears the buffer
+    """
+    if request.method == 'PUT':
+        data = request.get_json(silent=True) or {}
+        if 'threshold_ms' not in data:
+            return jsonify({
+                'success': False,
+                'error': 'Missing required fields',
+                'missing_fields': ['threshold_ms']
+            }), 400
+        try:
+            diagnostics.set_slow_request_threshold(data['threshold_ms'])
+        except (TypeError, ValueError) as e:
+            return jsonify({
+                'success': False,
+                'error': 'Invalid threshold',
+                'message': str(e)
+            }), 400
+    elif request.method == 'DELETE':
+        diagnostics.slow_requests.clear()
+
+    return jsonify({
+        'success': True,
+        'threshold_ms': diagnostics.slow_request_threshold_ms,
+        'capacity': diagnostics.slow_requests.maxlen,
+        'requests': list(diagnostics.slow_requests)
+    }), 200
+
+
 if __name__ == '__main__':
     # Run the Flask app
     app.run(
-        host='0.0.0.0',
-        port=5000,
-        debug=True
+        host=os.environ.get('HOST', '0.0.0.0'),
+        port=int(os.environ.get('PORT', 5000)),
+        debug=os.environ.get('FLASK_DEBUG', '1') == '1'
     )
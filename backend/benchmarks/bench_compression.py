@@ -0,0 +1,131 @@
+"""
+Benchmark: bytes on the wire and end-to-end latency vs. CPU cost
+for compressed /batch-predict and /predict traffic
+Run with: python benchmarks/bench_compression.py [--link-kbps 256]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import content_encoding
+from app import app
+from content_encoding import zstandard
+
+PAYLOAD_SIZES = [1, 10, 100, 1000, 5000]
+REPEATS = 5
+
+
+def make_samples(n):
+    """Generate n realistic-looking telemetry samples"""
+    rng = np.random.default_rng(42)
+    return [{
+        'ambient': round(float(rng.uniform(15, 35)), 4),
+        'coolant': round(float(rng.uniform(10, 30)), 4),
+        'u_d': round(float(rng.uniform(-50, 50)), 4),
+        'u_q': round(float(rng.uniform(-50, 50)), 4),
+        'motor_speed': round(float(rng.uniform(0, 3000)), 2),
+        'i_d': round(float(rng.uniform(-50, 50)), 4),
+        'i_q': round(float(rng.uniform(-50, 50)), 4)
+    } for _ in range(n)]
+
+
+def decompress_response(response):
+    """Decode a response body the way an HTTP client would"""
+    encoding = response.headers.get('Content-Encoding')
+    if encoding == 'gzip':
+        return gzip.decompress(response.data)
+    if encoding == 'zstd':
+        return zstandard.ZstdDecompressor().decompressobj().decompress(response.data)
+    return response.data
+
+
+def run_case(client, n, request_encoding, response_encoding, link_bytes_per_sec):
+    """
+    Send one payload size with one request encoding and one accepted
+    response encoding, return averaged measurements
+    """
+    if n == 1:
+        url, raw = '/predict', json.dumps(make_samples(1)[0]).encode('utf-8')
+    else:
+        url, raw = '/batch-predict', json.dumps({'samples': make_samples(n)}).encode('utf-8')
+
+    headers = {'Accept-Encoding': response_encoding}
+    start = time.perf_counter()
+    body = raw
+    if request_encoding != 'identity':
+        body = content_encoding.compress_bytes(request_encoding, raw)
+        headers['Content-Encoding'] = request_encoding
+    compress_cpu = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        response = client.post(url, data=body, content_type='application/json', headers=headers)
+        latencies.append(time.perf_counter() - start)
+    assert response.status_code == 200, response.data
+
+    start = time.perf_counter()
+    decoded = decompress_response(response)
+    decompress_cpu = time.perf_counter() - start
+    json.loads(decoded)
+
+    # Client CPU covers compressing the request and decoding the response
+    client_cpu_ms = (compress_cpu + decompress_cpu) * 1000
+    wire_bytes = len(body) + len(response.data)
+    server_ms = float(np.median(latencies)) * 1000
+    transfer_ms = wire_bytes / link_bytes_per_sec * 1000
+    return {
+        'request_bytes': len(body),
+        'response_bytes': len(response.data),
+        'wire_bytes': wire_bytes,
+        'server_ms': server_ms,
+        'client_cpu_ms': client_cpu_ms,
+        'end_to_end_ms': server_ms + client_cpu_ms + transfer_ms
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--link-kbps', type=float, default=256.0,
+                        help='Simulated link bandwidth in kbit/s (default: 256)')
+    args = parser.parse_args()
+    link_bytes_per_sec = args.link_kbps * 1000 / 8
+
+    app.config['TESTING'] = True
+    encodings = ['identity'] + content_encoding.supported_encodings()[::-1]
+
+    width = 104
+    print("=" * width)
+    print(f"Compression benchmark (link: {args.link_kbps:.0f} kbit/s, "
+          f"response threshold: {content_encoding.COMPRESSION_MIN_SIZE} bytes)")
+    print("=" * width)
+    print(f"{'samples':>8s} | {'request':8s} | {'response':8s} | {'req bytes':>10s} | "
+          f"{'resp bytes':>10s} | {'ratio':>6s} | {'server ms':>9s} | {'client ms':>9s} | "
+          f"{'end-to-end ms':>13s}")
+    print("-" * width)
+
+    with app.test_client() as client:
+        for n in PAYLOAD_SIZES:
+            baseline = None
+            for request_encoding in encodings:
+                for response_encoding in encodings:
+                    result = run_case(client, n, request_encoding, response_encoding,
+                                      link_bytes_per_sec)
+                    if baseline is None:
+                        baseline = result['wire_bytes']
+                    print(f"{n:8d} | {request_encoding:8s} | {response_encoding:8s} | "
+                          f"{result['request_bytes']:10d} | {result['response_bytes']:10d} | "
+                          f"{baseline / result['wire_bytes']:6.2f} | {result['server_ms']:9.2f} | "
+                          f"{result['client_cpu_ms']:9.2f} | {result['end_to_end_ms']:13.1f}")
+            print("-" * width)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark: per-request overhead of slow-request capture on /predict
+Run with: python benchmarks/bench_diagnostics.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import diagnostics
+from app import app
+
+REQUESTS = 2000
+ROUNDS = 10
+PAYLOAD = {
+    'ambient': 25.5,
+    'coolant': 22.3,
+    'u_d': 0.45,
+    'u_q': 0.38,
+    'motor_speed': 1500,
+    'i_d': 12.5,
+    'i_q': 15.2
+}
+
+
+def measure(client, n):
+    """Latencies of n /predict requests in microseconds"""
+    latencies = []
+    for _ in range(n):
+        start = time.perf_counter()
+        client.post('/predict', json=PAYLOAD)
+        latencies.append(time.perf_counter() - start)
+    return [latency * 1e6 for latency in latencies]
+
+
+def main():
+    app.config['TESTING'] = True
+    modes = [
+        ('capture off', None),
+        ('capture on, nothing slow', 1e9),
+        ('capture on, every request', 0)
+    ]
+
+    print("=" * 64)
+    print(f"Slow-request capture overhead ({REQUESTS} /predict requests per mode)")
+    print("=" * 64)
+    # Interleave modes in rounds so drift and warm-up affect them equally
+    latencies = {label: [] for label, _ in modes}
+    with app.test_client() as client:
+        measure(client, 200)  # warm-up
+        for _ in range(ROUNDS):
+            for label, threshold in modes:
+                diagnostics.set_slow_request_threshold(threshold)
+                latencies[label] += measure(client, REQUESTS // ROUNDS)
+                diagnostics.slow_requests.clear()
+    diagnostics.set_slow_request_threshold(None)
+
+    for label, _ in modes:
+        values = np.array(latencies[label])
+        print(f"{label:28s} | median: {np.median(values):8.1f} us | "
+              f"p99: {np.percentile(values, 99):8.1f} us")
+    print("-" * 64)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark: cost of drift monitoring per request and per batch
+Run with: python benchmarks/bench_drift.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, drift_monitor
+
+BATCH_SIZES = [1, 10, 100, 1000, 10000]
+REPEATS = 200
+PAYLOAD = {
+    'ambient': 25.5,
+    'coolant': 22.3,
+    'u_d': 0.45,
+    'u_q': 0.38,
+    'motor_speed': 1500,
+    'i_d': 12.5,
+    'i_q': 15.2
+}
+
+
+def median_us(func, repeats=REPEATS):
+    func()  # warm-up
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1e6
+
+
+def main():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        predict_us = median_us(lambda: client.post('/predict', json=PAYLOAD))
+
+    rng = np.random.default_rng(0)
+    print("=" * 72)
+    print(f"Drift monitor overhead (median /predict latency: {predict_us:.0f} us)")
+    print("=" * 72)
+    print(f"{'batch rows':>10s} | {'update us':>10s} | {'us per row':>10s} | {'% of /predict':>13s}")
+    print("-" * 72)
+    for n in BATCH_SIZES:
+        rows = rng.random((n, len(drift_monitor.feature_names)))
+        update_us = median_us(lambda: drift_monitor.update(rows), repeats=max(5, REPEATS // n))
+        share = f"{update_us / predict_us * 100:12.2f}%" if n == 1 else f"{'':>13s}"
+        print(f"{n:10d} | {update_us:10.1f} | {update_us / n:10.3f} | {share}")
+    print("-" * 72)
+    report_us = median_us(drift_monitor.report, repeats=50)
+    print(f"report() over the full window: {report_us:.0f} us")
+
+
+if __name__ == '__main__':
+    main()
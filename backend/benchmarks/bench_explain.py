@@ -0,0 +1,78 @@
+"""
+Benchmark: TreeSHAP explanation latency for a 100-tree Random Forest
+Single-row latency, batch throughput and explainer memory at several forest
+sizes, up to the training set size train_model.py works with (100k rows)
+Run with: python benchmarks/bench_explain.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from explain import TreeExplainer
+
+TRAINING_SIZES = [500, 2000, 5000, 100000]
+BATCH_SIZES = [10, 100, 1000]
+REPEATS = 20
+# Batch timings are skipped once rows x leaves exceeds this
+MAX_BATCH_ELEMENTS = 50_000_000
+
+
+def make_data(n):
+    """Scaled synthetic features with a nonlinear target"""
+    rng = np.random.default_rng(42)
+    X = rng.random((n, 7))
+    y = 0.4 * X[:, 0] - 0.3 * X[:, 1] + 0.8 * X[:, 4] + np.abs(X[:, 5] - 0.5) * X[:, 6]
+    return X, y + rng.normal(0, 0.02, n)
+
+
+def median_ms(func, repeats=REPEATS):
+    func()  # warm-up
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000
+
+
+def main():
+    print("=" * 150)
+    print("TreeSHAP benchmark (RandomForestRegressor, 100 trees, max_depth=15, min_samples_split=10)")
+    print("=" * 150)
+    print(f"{'train rows':>10s} | {'leaves':>7s} | {'memory MB':>9s} | {'precompute ms':>13s} | "
+          f"{'predict ms':>10s} | {'explain 1 row ms':>16s} | "
+          + " | ".join(f"{f'batch {b} ms/row':>16s}" for b in BATCH_SIZES))
+    print("-" * 150)
+
+    for n in TRAINING_SIZES:
+        X, y = make_data(n)
+        model = RandomForestRegressor(
+            n_estimators=100, random_state=42, max_depth=15, min_samples_split=10
+        ).fit(X, y)
+
+        start = time.perf_counter()
+        explainer = TreeExplainer(model)
+        precompute_ms = (time.perf_counter() - start) * 1000
+
+        rows = np.random.default_rng(0).random((max(BATCH_SIZES), 7))
+        predict_ms = median_ms(lambda: model.predict(rows[:1]))
+        single_ms = median_ms(lambda: explainer.shap_values(rows[:1]), repeats=5)
+        batch_ms = [
+            median_ms(lambda b=b: explainer.shap_values(rows[:b]), repeats=3) / b
+            if b * explainer.n_leaves <= MAX_BATCH_ELEMENTS else None
+            for b in BATCH_SIZES
+        ]
+
+        print(f"{n:10d} | {explainer.n_leaves:7d} | {explainer.nbytes / 1e6:9.1f} | "
+              f"{precompute_ms:13.1f} | {predict_ms:10.2f} | {single_ms:16.2f} | "
+              + " | ".join(f"{ms:16.3f}" if ms is not None else f"{'-':>16s}" for ms in batch_ms))
+    print("-" * 150)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark: router throughput with 1 to 8 local app.py backends
+Each shard is a separate `python app.py` process; the router runs in-process
+Run with: python benchmarks/bench_router.py
+"""
+
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from werkzeug.serving import make_server
+
+import router
+
+SHARD_COUNTS = [1, 2, 4, 8]
+BASE_PORT = 5100
+BATCH_SIZE = 1000
+BATCH_ROUNDS = 5
+PREDICT_CALLS = 400
+CLIENT_THREADS = 16
+SAMPLE = {
+    'ambient': 25.5,
+    'coolant': 22.3,
+    'u_d': 0.45,
+    'u_q': 0.38,
+    'motor_speed': 1500,
+    'i_d': 12.5,
+    'i_q': 15.2
+}
+
+
+def start_backends(n):
+    env = dict(os.environ, FLASK_DEBUG='0', HOST='127.0.0.1')
+    processes = [
+        subprocess.Popen([sys.executable, 'app.py'], cwd=BACKEND_DIR,
+                         env=dict(env, PORT=str(BASE_PORT + i)),
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        for i in range(n)
+    ]
+    urls = [f'http://127.0.0.1:{BASE_PORT + i}' for i in range(n)]
+    for url in urls:
+        for _ in range(300):
+            try:
+                urllib.request.urlopen(f'{url}/health', timeout=1)
+                break
+            except OSError:
+                time.sleep(0.1)
+    return processes, urls
+
+
+def post(url, body):
+    request = urllib.request.Request(url, data=json.dumps(body).encode(),
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=60) as response:
+        return response.read()
+
+
+def main():
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, router.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    router_url = f'http://127.0.0.1:{server.port}'
+
+    batch = {'samples': [dict(SAMPLE, motor_id=f'motor-{i}') for i in range(BATCH_SIZE)]}
+
+    print("=" * 72)
+    print(f"Router benchmark ({os.cpu_count()} CPU cores, batch of {BATCH_SIZE}, "
+          f"{CLIENT_THREADS} /predict clients)")
+    print("=" * 72)
+    print(f"{'shards':>6s} | {'batch ms':>9s} | {'batch samples/s':>15s} | {'predict req/s':>13s}")
+    print("-" * 72)
+
+    for n in SHARD_COUNTS:
+        processes, urls = start_backends(n)
+        try:
+            router.pool.set_backends(urls)
+            post(f'{router_url}/batch-predict', batch)  # warm up connections
+
+            start = time.perf_counter()
+            for _ in range(BATCH_ROUNDS):
+                post(f'{router_url}/batch-predict', batch)
+            batch_seconds = (time.perf_counter() - start) / BATCH_ROUNDS
+
+            with ThreadPoolExecutor(CLIENT_THREADS) as clients:
+                start = time.perf_counter()
+                list(clients.map(
+                    lambda i: post(f'{router_url}/predict', dict(SAMPLE, motor_id=f'motor-{i}')),
+                    range(PREDICT_CALLS)
+                ))
+                predict_seconds = time.perf_counter() - start
+
+            print(f"{n:6d} | {batch_seconds * 1000:9.1f} | {BATCH_SIZE / batch_seconds:15.0f} | "
+                  f"{PREDICT_CALLS / predict_seconds:13.0f}")
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.wait()
+    print("-" * 72)
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark: /sweep latency by grid size, format, Accept-Encoding and cache
+state, compared with issuing the same points as individual /predict calls
+Run with: python benchmarks/bench_sweep.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, sweep_cache
+
+GRID_SIZES = [10, 100, 316, 1000]
+PREDICT_CALLS = 200
+BASE = {
+    'ambient': 25.5,
+    'coolant': 22.3,
+    'u_d': 0.45,
+    'u_q': 0.38,
+    'motor_speed': 1500,
+    'i_d': 12.5,
+    'i_q': 15.2
+}
+
+
+def timed_ms(func):
+    start = time.perf_counter()
+    result = func()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def main():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        per_predict_ms, _ = timed_ms(lambda: [client.post('/predict', json=BASE)
+                                              for _ in range(PREDICT_CALLS)])
+        per_predict_ms /= PREDICT_CALLS
+
+        print("=" * 108)
+        print(f"Sweep benchmark (motor_speed x i_q, single /predict: {per_predict_ms:.2f} ms)")
+        print("=" * 108)
+        print(f"{'grid':>11s} | {'points':>9s} | {'format':6s} | {'accept':8s} | {'miss ms':>9s} | "
+              f"{'hit ms':>8s} | {'body MB':>8s} | {'as /predict calls':>17s}")
+        print("-" * 108)
+
+        for n in GRID_SIZES:
+            payload = {
+                'base': BASE,
+                'axes': [
+                    {'feature': 'motor_speed', 'start': 0, 'stop': 3000, 'steps': n},
+                    {'feature': 'i_q', 'start': -50, 'stop': 50, 'steps': n}
+                ]
+            }
+            for sweep_format in ('binary', 'json'):
+                for accept in ('identity', 'gzip', 'zstd'):
+                    payload['format'] = sweep_format
+                    headers = {'Accept-Encoding': accept}
+                    sweep_cache.clear()
+                    miss_ms, response = timed_ms(
+                        lambda: client.post('/sweep', json=payload, headers=headers))
+                    assert response.status_code == 200, response.data
+                    hit_ms, _ = timed_ms(lambda: client.post('/sweep', json=payload, headers=headers))
+                    print(f"{f'{n}x{n}':>11s} | {n * n:9d} | {sweep_format:6s} | {accept:8s} | "
+                          f"{miss_ms:9.1f} | {hit_ms:8.1f} | {len(response.data) / 1e6:8.2f} | "
+                          f"{n * n * per_predict_ms / 1000:15.1f} s")
+        print("-" * 108)
+        print(f"Cache: {sweep_cache.size / 1e6:.1f} MB of {sweep_cache.max_bytes / 1e6:.1f} MB")
+
+if __name__ == '__main__':
+    main()
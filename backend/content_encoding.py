@@ -0,0 +1,212 @@
+"""
+Compressed request/response transport for the Flask backend
+Decodes gzip/zstd request bodies and negotiates response compression
+"""
+
+import gzip
+import io
+import json
+import os
+import zlib
+
+from flask import request
+from werkzeug.wsgi import get_input_stream
+
+try:
+    import zstandard
+except ImportError:  # zstd support is optional
+    zstandard = None
+
+# Exceptions raised by the decoders on corrupt or truncated input
+DECODE_ERRORS = (OSError, EOFError, zlib.error)
+if zstandard is not None:
+    DECODE_ERRORS += (zstandard.ZstdError,)
+
+# Decompressed request bodies larger than this are rejected (decompression bomb cap)
+MAX_DECOMPRESSED_SIZE = int(os.environ.get('MAX_DECOMPRESSED_SIZE', 16 * 1024 * 1024))
+
+# Responses smaller than this are sent uncompressed
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def supported_encodings():
+    """
+    List the content encodings this server can decode and produce
+    Returns:
+        list: Encodings in order of server preference
+    """
+    if zstandard is not None:
+        return ['zstd', 'gzip']
+    return ['gzip']
+
+
+def negotiate_encoding():
+    """
+    Pick the response encoding for the current request
+    Returns:
+        str: Best encoding the client accepts, or None to send the body as is
+    """
+    return request.accept_encodings.best_match(supported_encodings())
+
+
+def _open_decoder(encoding, stream):
+    """Wrap a compressed stream in a file-like reader yielding plain bytes"""
+    if encoding == 'gzip':
+        return gzip.GzipFile(fileobj=stream, mode='rb')
+    if encoding == 'zstd' and zstandard is not None:
+        return zstandard.ZstdDecompressor().stream_reader(stream)
+    return None
+
+
+def decompress_stream(encoding, stream, max_size=MAX_DECOMPRESSED_SIZE):
+    """
+    Incrementally decompress a request body, enforcing a size cap
+    Args:
+        encoding: Content-Encoding of the stream ('gzip' or 'zstd')
+        stream: File-like object holding the compressed body
+        max_size: Maximum number of decompressed bytes accepted
+    Returns:
+        bytes: Decompressed body
+    Raises:
+        LookupError: Encoding is not supported
+        OverflowError: Decompressed body exceeds max_size
+        ValueError: Body is not valid for the declared encoding
+    """
+    decoder = _open_decoder(encoding, stream)
+    if decoder is None:
+        raise LookupError(f'Unsupported content encoding: {encoding}')
+
+    buffer = io.BytesIO()
+    try:
+        while True:
+            # Never ask for more than one byte past the cap
+            chunk = decoder.read(min(READ_CHUNK_SIZE, max_size - buffer.tell() + 1))
+            if not chunk:
+                break
+            buffer.write(chunk)
+            if buffer.tell() > max_size:
+                raise OverflowError(f'Decompressed body exceeds {max_size} bytes')
+    except DECODE_ERRORS as e:
+        raise ValueError(f'Malformed {encoding} body: {e}') from e
+
+    return buffer.getvalue()
+
+
+def compress_bytes(encoding, data):
+    """Compress a complete payload with the given encoding"""
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+
+
+def _compress_iter(encoding, chunks):
+    """
+    Compress a streamed response chunk by chunk
+    Each chunk is flushed on its own, so the client can decode it as soon
+    as it arrives instead of waiting for the compressor's buffer to fill
+    """
+    if encoding == 'gzip':
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        flush_mode = zlib.Z_SYNC_FLUSH
+    else:
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+        flush_mode = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        if not chunk:
+            continue
+        out = compressor.compress(chunk) + compressor.flush(flush_mode)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+class DecompressionMiddleware:
+    """
+    WSGI middleware that decodes gzip/zstd request bodies before Flask sees them,
+    so request.get_json() works unchanged in every endpoint
+    """
+
+    def __init__(self, wsgi_app, max_size=MAX_DECOMPRESSED_SIZE):
+        self.wsgi_app = wsgi_app
+        self.max_size = max_size
+
+    def __call__(self, environ, start_response):
+        encoding = environ.get('HTTP_CONTENT_ENCODING', '').strip().lower()
+        if not encoding or encoding == 'identity':
+            return self.wsgi_app(environ, start_response)
+
+        try:
+            body = decompress_stream(encoding, get_input_stream(environ), self.max_size)
+        except LookupError as e:
+            return self._error(start_response, '415 Unsupported Media Type',
+                               'Unsupported content encoding', str(e))
+        except OverflowError as e:
+            return self._error(start_response, '413 Request Entity Too Large',
+                               'Decompressed payload too large', str(e))
+        except ValueError as e:
+            return self._error(start_response, '400 Bad Request',
+                               'Invalid compressed payload', str(e))
+
+        environ['wsgi.input'] = io.BytesIO(body)
+        environ['CONTENT_LENGTH'] = str(len(body))
+        environ.pop('HTTP_CONTENT_ENCODING', None)
+        return self.wsgi_app(environ, start_response)
+
+    @staticmethod
+    def _error(start_response, status, error, message):
+        payload = json.dumps({
+            'success': False,
+            'error': error,
+            'message': message
+        }).encode('utf-8')
+        start_response(status, [
+            ('Content-Type', 'application/json'),
+            ('Content-Length', str(len(payload)))
+        ])
+        return [payload]
+
+
+def compress_response(response):
+    """
+    after_request hook: compress the response if the client accepts it
+    and the body is large enough to be worth the CPU
+    """
+    if (response.status_code < 200
+            or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+
+    if response.direct_passthrough:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_iter(encoding, response.response)
+        response.headers.pop('Content-Length', None)
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    data = response.get_data()
+    if len(data) < COMPRESSION_MIN_SIZE:
+        return response
+
+    response.set_data(compress_bytes(encoding, data))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_app(app, max_size=MAX_DECOMPRESSED_SIZE):
+    """Install request decompression and response compression on a Flask app"""
+    app.wsgi_app = DecompressionMiddleware(app.wsgi_app, max_size=max_size)
+    app.after_request(compress_response)
@@ -0,0 +1,200 @@
+"""
+On-demand diagnostics for the Flask backend
+Sampling profiler and slow-request capture, both off by default
+"""
+
+import hmac
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from functools import wraps
+
+from flask import g, jsonify, request
+
+# Admin endpoints are disabled unless a token is configured
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+
+MAX_PROFILE_SECONDS = 60
+DEFAULT_SAMPLE_INTERVAL_MS = 5
+
+
+def _parse_threshold(threshold_ms):
+    """Validate a slow-request threshold; None disables capture"""
+    if threshold_ms is None:
+        return None
+    threshold_ms = float(threshold_ms)
+    if not math.isfinite(threshold_ms) or threshold_ms < 0:
+        raise ValueError(f'threshold_ms must be a finite number >= 0, got {threshold_ms}')
+    return threshold_ms
+
+
+# Requests slower than this are captured; None disables capture entirely
+slow_request_threshold_ms = _parse_threshold(os.environ.get('SLOW_REQUEST_THRESHOLD_MS') or None)
+slow_requests = deque(maxlen=int(os.environ.get('SLOW_REQUEST_BUFFER_SIZE', 100)))
+
+_profile_lock = threading.Lock()
+
+
+def require_admin(view):
+    """Reject the request unless it carries the configured X-Admin-Token"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            return jsonify({
+                'success': False,
+                'error': 'Admin endpoints disabled',
+                'message': 'Set ADMIN_TOKEN to enable diagnostics.'
+            }), 403
+        token = request.headers.get('X-Admin-Token', '')
+        if not hmac.compare_digest(token.encode('utf-8'), ADMIN_TOKEN.encode('utf-8')):
+            return jsonify({
+                'success': False,
+                'error': 'Invalid admin token'
+            }), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+
+# ---------------------------------------------------------------------------
+# Sampling profiler
+# ---------------------------------------------------------------------------
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}:{code.co_firstlineno}"
+
+
+def _collapse(frame):
+    """Render a frame's call stack root-first as a collapsed-stack line"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+def sample_stacks(seconds, interval_ms=DEFAULT_SAMPLE_INTERVAL_MS):
+    """
+    Sample the stacks of all other Python threads for a fixed duration
+    The calling thread does the sampling and is left out of the result
+    Args:
+        seconds: How long to sample
+        interval_ms: Delay between samples in milliseconds
+    Returns:
+        Counter: Collapsed stack string -> number of samples
+    Raises:
+        RuntimeError: Another profile is already running
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise RuntimeError('A profile is already running')
+
+    stacks = Counter()
+    try:
+        sampler = threading.get_ident()
+        interval = interval_ms / 1000.0
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident != sampler:
+                    stacks[_collapse(frame)] += 1
+            time.sleep(interval)
+    finally:
+        _profile_lock.release()
+
+    return stacks
+
+
+def format_collapsed(stacks):
+    """Render sampled stacks in the collapsed format read by flamegraph.pl / speedscope"""
+    return ''.join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+# ---------------------------------------------------------------------------
+# Slow-request capture
+# ---------------------------------------------------------------------------
+
+class StageTimer:
+    """Accumulates wall time per named stage of a request"""
+
+    def __init__(self):
+        self.start = self.last = time.perf_counter()
+        self.stages = {}
+
+    def mark(self, stage):
+        """Attribute the time since the previous mark to `stage`"""
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + (now - self.last)
+        self.last = now
+
+
+def mark_stage(stage):
+    """Record the end of a request stage; a no-op when capture is off"""
+    timer = g.get('stage_timer')
+    if timer is not None:
+        timer.mark(stage)
+
+
+def payload_shape(value, depth=0, max_depth=4):
+    """
+    Describe the structure of a JSON payload without its values
+    Lists are summarised by their length and the shape of their first item
+    """
+    if depth >= max_depth:
+        return '...'
+    if isinstance(value, dict):
+        return {key: payload_shape(item, depth + 1, max_depth) for key, item in value.items()}
+    if isinstance(value, list):
+        return {
+            'length': len(value),
+            'item': payload_shape(value[0], depth + 1, max_depth) if value else None
+        }
+    return type(value).__name__
+
+
+def start_timer():
+    """before_request hook: start stage timing when capture is enabled"""
+    if slow_request_threshold_ms is not None:
+        g.stage_timer = StageTimer()
+
+
+def capture_slow_request(response):
+    """after_request hook: keep a timing record of requests above the threshold"""
+    timer = g.get('stage_timer')
+    if timer is None:
+        return response
+
+    timer.mark('respond')
+    duration_ms = (timer.last - timer.start) * 1000
+    threshold = slow_request_threshold_ms
+    if threshold is not None and duration_ms >= threshold:
+        slow_requests.append({
+            'timestamp': datetime.now().isoformat(),
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(duration_ms, 3),
+            'stages_ms': {stage: round(seconds * 1000, 3) for stage, seconds in timer.stages.items()},
+            'content_length': request.content_length,
+            'payload_shape': payload_shape(request.get_json(silent=True))
+        })
+    return response
+
+
+def set_slow_request_threshold(threshold_ms):
+    """
+    Enable capture above `threshold_ms`, or disable it with None
+    Raises:
+        ValueError: The threshold is negative or not a finite number
+    """
+    global slow_request_threshold_ms
+    slow_request_threshold_ms = _parse_threshold(threshold_ms)
+
+
+def init_app(app):
+    """Install slow-request capture hooks on a Flask app"""
+    app.before_request(start_timer)
+    app.after_request(capture_slow_request)
@@ -0,0 +1,222 @@
+"""
+Input drift monitoring against training-time feature distributions
+Fixed-memory live histograms compared to reference histograms with PSI/KS
+"""
+
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime
+
+import numpy as np
+
+DEFAULT_BINS = 20
+
+# Conventional PSI bands: < 0.1 stable, 0.1-0.25 moderate shift, > 0.25 drift
+PSI_MODERATE = 0.1
+PSI_DRIFT = 0.25
+
+# Floor for empty bins so PSI stays finite
+PSI_EPSILON = 1e-4
+
+# Scaled values within this distance of [0, 1] count as in range: MinMax
+# scaling maps the training extremes to e.g. 1.0000000000000002
+RANGE_TOLERANCE = 1e-9
+
+# Batches up to this size are binned in plain Python, which beats
+# NumPy's per-call overhead for the single-row /predict path
+SMALL_BATCH_ROWS = 8
+
+
+def bin_counts(X_scaled, edges):
+    """
+    Count scaled rows into per-feature bins
+    Bin 0 holds values below the training range (< 0), the last bin values
+    above it (> 1), and the bins in between are delimited by `edges`.
+    Rounding noise within RANGE_TOLERANCE of the range counts as in range
+    Args:
+        X_scaled: Array of shape (n_samples, n_features), MinMax-scaled
+        edges: Interior bin edges of shape (n_features, n_bins - 1)
+    Returns:
+        np.ndarray: Counts of shape (n_features, n_bins + 2)
+    """
+    X_scaled = np.asarray(X_scaled, dtype=np.float64)
+    n_features, n_inner = edges.shape
+    width = n_inner + 3
+
+    index = np.empty(X_scaled.shape, dtype=np.intp)
+    for j in range(n_features):
+        index[:, j] = np.searchsorted(edges[j], X_scaled[:, j], side='right') + 1
+    index[X_scaled < -RANGE_TOLERANCE] = 0
+    index[X_scaled > 1 + RANGE_TOLERANCE] = width - 1
+
+    flat = index + np.arange(n_features) * width
+    return np.bincount(flat.ravel(), minlength=n_features * width).reshape(n_features, width)
+
+
+def build_reference(X_scaled, feature_names, n_bins=DEFAULT_BINS):
+    """
+    Summarise training features as quantile-binned reference histograms
+    Returns:
+        dict: feature_names, interior bin edges and reference counts
+    """
+    # Training rows define the range; clip rounding noise from the scaler
+    X_scaled = np.clip(np.asarray(X_scaled, dtype=np.float64), 0, 1)
+    quantiles = np.linspace(0, 1, n_bins + 1)[1:-1]
+    edges = np.quantile(X_scaled, quantiles, axis=0).T
+    return {
+        'feature_names': list(feature_names),
+        'edges': edges,
+        'counts': bin_counts(X_scaled, edges),
+        'n_samples': int(X_scaled.shape[0])
+    }
+
+
+def population_stability_index(expected, actual):
+    """PSI between two histograms with the same bins"""
+    expected = np.maximum(expected / max(expected.sum(), 1), PSI_EPSILON)
+    actual = np.maximum(actual / max(actual.sum(), 1), PSI_EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def binned_ks(expected, actual):
+    """Kolmogorov-Smirnov statistic evaluated at the bin edges"""
+    expected_cdf = np.cumsum(expected) / max(expected.sum(), 1)
+    actual_cdf = np.cumsum(actual) / max(actual.sum(), 1)
+    return float(np.max(np.abs(actual_cdf - expected_cdf)))
+
+
+class DriftMonitor:
+    """
+    Live input histograms over a sliding time window, in fixed memory
+
+    The window is split into `n_buckets` sub-windows, each holding one
+    count array; a bucket is zeroed when the ring wraps round to it.
+    Out-of-range totals since startup are kept separately.
+    """
+
+    def __init__(self, reference=None, feature_names=None, window_seconds=3600,
+                 n_buckets=12, n_bins=DEFAULT_BINS):
+        self.reference = reference
+        if reference is not None:
+            self.feature_names = reference['feature_names']
+            self.edges = reference['edges']
+        else:
+            # Without a reference, still track the live shape and range
+            self.feature_names = list(feature_names)
+            inner = np.linspace(0, 1, n_bins + 1)[1:-1]
+            self.edges = np.tile(inner, (len(self.feature_names), 1))
+
+        n_features, n_inner = self.edges.shape
+        self._width = n_inner + 3
+        self._edge_lists = self.edges.tolist()
+        self.bucket_seconds = window_seconds / n_buckets
+        self.buckets = np.zeros((n_buckets, n_features, self._width), dtype=np.int64)
+        self.bucket_epochs = np.full(n_buckets, -1, dtype=np.int64)
+        # Counts since startup, for the out-of-range totals
+        self.totals = np.zeros((n_features, self._width), dtype=np.int64)
+        self.started = datetime.now().isoformat()
+        self.last_report = None
+        self._lock = threading.Lock()
+
+    def _flat_bins(self, rows):
+        """Flat (feature, bin) indices of a few rows, matching bin_counts()"""
+        width = self._width
+        flat = []
+        for row in rows:
+            for j, value in enumerate(row):
+                if value < -RANGE_TOLERANCE:
+                    b = 0
+                elif value > 1 + RANGE_TOLERANCE:
+                    b = width - 1
+                else:
+                    b = bisect_right(self._edge_lists[j], value) + 1
+                flat.append(j * width + b)
+        return flat
+
+    def update(self, X_scaled):
+        """Add a batch of scaled rows to the current bucket, skipping non-finite rows"""
+        X_scaled = np.asarray(X_scaled, dtype=np.float64)
+        finite = np.isfinite(X_scaled).all(axis=1)
+        if not finite.all():
+            X_scaled = X_scaled[finite]
+        if X_scaled.shape[0] <= SMALL_BATCH_ROWS:
+            flat, counts = self._flat_bins(X_scaled.tolist()), None
+        else:
+            flat, counts = None, bin_counts(X_scaled, self.edges)
+
+        epoch = int(time.time() // self.bucket_seconds)
+        slot = epoch % len(self.buckets)
+        with self._lock:
+            if self.bucket_epochs[slot] != epoch:
+                self.buckets[slot] = 0
+                self.bucket_epochs[slot] = epoch
+            if counts is None:
+                bucket, totals = self.buckets[slot].reshape(-1), self.totals.reshape(-1)
+                for index in flat:
+                    bucket[index] += 1
+                    totals[index] += 1
+            else:
+                self.buckets[slot] += counts
+                self.totals += counts
+
+    def live_counts(self):
+        """Sum of the buckets that are still inside the window"""
+        oldest = int(time.time() // self.bucket_seconds) - len(self.buckets) + 1
+        with self._lock:
+            current = self.bucket_epochs >= oldest
+            return self.buckets[current].sum(axis=0)
+
+    def report(self):
+        """
+        Per-feature drift scores for the current window
+        Returns:
+            dict: Window size, and PSI, KS, status and out-of-range counts per feature
+        """
+        live = self.live_counts()
+        with self._lock:
+            totals = self.totals.copy()
+        features = {}
+        for j, name in enumerate(self.feature_names):
+            entry = {
+                'samples': int(live[j].sum()),
+                'out_of_range': {
+                    'below_min': int(totals[j, 0]),
+                    'above_max': int(totals[j, -1])
+                }
+            }
+            if self.reference is not None and entry['samples']:
+                psi = population_stability_index(self.reference['counts'][j], live[j])
+                entry['psi'] = round(psi, 6)
+                entry['ks'] = round(binned_ks(self.reference['counts'][j], live[j]), 6)
+                entry['status'] = (
+                    'drift' if psi > PSI_DRIFT else
+                    'moderate' if psi > PSI_MODERATE else
+                    'stable'
+                )
+            features[name] = entry
+
+        self.last_report = {
+            'reference_loaded': self.reference is not None,
+            'window_seconds': self.bucket_seconds * len(self.buckets),
+            'window_samples': int(live[0].sum()) if len(live) else 0,
+            'monitoring_since': self.started,
+            'features': features,
+            'timestamp': datetime.now().isoformat()
+        }
+        return self.last_report
+
+    def start_schedule(self, interval_seconds):
+        """Recompute the report every `interval_seconds` and log drifting features"""
+        def run():
+            while True:
+                time.sleep(interval_seconds)
+                report = self.report()
+                drifting = [name for name, entry in report['features'].items()
+                            if entry.get('status') == 'drift']
+                if drifting:
+                    print(f"⚠ Input drift detected: {', '.join(drifting)}")
+
+        thread = threading.Thread(target=run, name='drift-monitor', daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,568 @@
+"""
+Motor-affinity router for a sharded inference tier
+Consistently hashes motor_id to one of N app.py backends and fans batches out by shard
+"""
+
+import hashlib
+import http.client
+import itertools
+import json
+import os
+import threading
+import time
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from flask import Flask, Response, request, jsonify
+from flask_cors import CORS
+
+import content_encoding
+
+VIRTUAL_NODES = int(os.environ.get('ROUTER_VIRTUAL_NODES', 100))
+BACKEND_TIMEOUT = float(os.environ.get('ROUTER_BACKEND_TIMEOUT', 10))
+HEALTH_CHECK_INTERVAL = float(os.environ.get('ROUTER_HEALTH_CHECK_INTERVAL', 5))
+
+
+class BackendError(Exception):
+    """A backend request failed without a usable response"""
+
+
+class BackendUnavailable(BackendError):
+    """A backend refused or dropped the connection, so it is treated as down"""
+
+
+class BackendTimeout(BackendError):
+    """A backend did not answer within BACKEND_TIMEOUT; it may still be working on the request"""
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+
+class HashRing:
+    """
+    Consistent hash ring with virtual nodes
+    Adding or removing a node only moves the keys that node gains or owned.
+    Lookups read an immutable snapshot, so membership can change concurrently.
+    """
+
+    def __init__(self, nodes=(), virtual_nodes=VIRTUAL_NODES):
+        self.virtual_nodes = virtual_nodes
+        self._lock = threading.Lock()
+        self._points = ([], [])  # (sorted hashes, owning node of each hash)
+        for node in nodes:
+            self.add(node)
+
+    @property
+    def nodes(self):
+        return sorted(set(self._points[1]))
+
+    def add(self, node):
+        with self._lock:
+            if node in self._points[1]:
+                return
+            ring = list(zip(*self._points))
+            ring += [(_hash(f'{node}#{i}'), node) for i in range(self.virtual_nodes)]
+            ring.sort()
+            self._points = ([h for h, _ in ring], [n for _, n in ring])
+
+    def remove(self, node):
+        with self._lock:
+            ring = [(h, n) for h, n in zip(*self._points) if n != node]
+            self._points = ([h for h, _ in ring], [n for _, n in ring])
+
+    def get(self, key):
+        """Node owning `key`, or None if the ring is empty"""
+        hashes, owners = self._points
+        if not hashes:
+            return None
+        return owners[bisect_right(hashes, _hash(key)) % len(hashes)]
+
+
+class BackendPool:
+    """Backends behind the router: hash ring membership, health and HTTP transport"""
+
+    def __init__(self, urls, virtual_nodes=VIRTUAL_NODES, timeout=BACKEND_TIMEOUT):
+        self.timeout = timeout
+        self.virtual_nodes = virtual_nodes
+        self._local = threading.local()
+        self._round_robin = itertools.count()
+        self.set_backends(urls)
+
+    def set_backends(self, urls):
+        """Replace the backend list; all backends start out healthy"""
+        self.urls = [url.rstrip('/') for url in urls]
+        self.ring = HashRing(self.urls, self.virtual_nodes)
+        self.status = {url: {'healthy': True, 'last_checked': None} for url in self.urls}
+
+    def route(self, motor_id=None):
+        """
+        Pick the backend for a request
+        Requests with a motor_id always go to the same healthy backend;
+        requests without one are spread round-robin
+        """
+        if motor_id is None:
+            motor_id = f'#round-robin-{next(self._round_robin)}'
+        return self.ring.get(str(motor_id))
+
+    def mark_down(self, url):
+        # Ignore backends dropped by set_backends while a request or probe was in flight
+        if url in self.status:
+            self.status[url]['healthy'] = False
+            self.ring.remove(url)
+
+    def mark_up(self, url):
+        if url in self.status:
+            self.status[url]['healthy'] = True
+            self.ring.add(url)
+
+    def _connection(self, url):
+        """Keep-alive connection per backend and thread"""
+        connections = self._local.__dict__.setdefault('connections', {})
+        if url not in connections:
+            parts = urlsplit(url)
+            connections[url] = http.client.HTTPConnection(parts.hostname, parts.port or 80,
+                                                           timeout=self.timeout)
+        return connections[url]
+
+    def request(self, url, method, path, body=None, headers=None):
+        """
+        Send a raw HTTP request to a backend
+        Returns:
+            tuple: (status code, response headers, body bytes)
+        Raises:
+            BackendUnavailable: The connection was refused, reset or closed
+            BackendTimeout: No response within the timeout; the request is not retried
+            BackendError: Any other transport or protocol failure
+        """
+        # One retry covers a keep-alive connection the backend has closed
+        for attempt in range(2):
+            connection = self._connection(url)
+            try:
+                connection.request(method, path, body=body, headers=headers or {})
+                response = connection.getresponse()
+                return response.status, response.headers, response.read()
+            except TimeoutError as e:
+                connection.close()
+                raise BackendTimeout(f'{url}: no response within {self.timeout:g}s') from e
+            except ConnectionError as e:  # refused, reset, RemoteDisconnected
+                connection.close()
+                if attempt:
+                    raise BackendUnavailable(f'{url}: {e}') from e
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                raise BackendError(f'{url}: {e}') from e
+
+    def send(self, url, method, path, payload=None):
+        """
+        Send a JSON request to a backend
+        Returns:
+            tuple: (status code, decoded JSON body)
+        Raises:
+            BackendError: See request(); also raised when the reply is not JSON
+        """
+        body = None if payload is None else json.dumps(payload)
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        status, _, data = self.request(url, method, path, body, headers)
+        try:
+            return status, json.loads(data)
+        except ValueError as e:
+            raise BackendError(f'{url}: invalid JSON response') from e
+
+    def check_health(self):
+        """Probe every backend's /health and update ring membership"""
+        for url in self.urls:
+            try:
+                status, body = self.send(url, 'GET', '/health')
+                healthy = status == 200 and isinstance(body, dict) and body.get('model_loaded', False)
+            except BackendError:
+                healthy = False
+            if url not in self.status:
+                continue
+            self.status[url]['last_checked'] = datetime.now().isoformat()
+            if healthy and not self.status[url]['healthy']:
+                self.mark_up(url)
+            elif not healthy and self.status[url]['healthy']:
+                self.mark_down(url)
+
+    def start_health_checks(self, interval_seconds=HEALTH_CHECK_INTERVAL):
+        def run():
+            while True:
+                self.check_health()
+                time.sleep(interval_seconds)
+
+        thread = threading.Thread(target=run, name='router-health', daemon=True)
+        thread.start()
+        return thread
+
+
+app = Flask(__name__)
+CORS(app)
+content_encoding.init_app(app)
+
+pool = BackendPool([
+    url.strip() for url in os.environ.get('ROUTER_BACKENDS', 'http://localhost:5000').split(',')
+    if url.strip()
+])
+executor = ThreadPoolExecutor(max_workers=int(os.environ.get('ROUTER_WORKERS', 32)))
+
+# Probe from import on, so the ring also refills under a WSGI server (0 disables)
+if HEALTH_CHECK_INTERVAL > 0:
+    pool.start_health_checks()
+
+# Input fields of app.py, checked here so a bad sample fails the whole batch
+# as on a single backend, instead of failing the other samples of its shard
+FEATURE_NAMES = ['ambient', 'coolant', 'u_d', 'u_q', 'motor_speed', 'i_d', 'i_q']
+
+
+# Backend response headers relayed to the client by proxy()
+PROXY_HEADERS = ('Content-Type', 'Content-Encoding', 'Vary', 'X-Sweep-Cache')
+
+
+def _motor_id(sample):
+    return sample.get('motor_id') if isinstance(sample, dict) else None
+
+
+def _no_backend():
+    return jsonify({
+        'success': False,
+        'error': 'No backend available'
+    }), 503
+
+
+def _failure(error):
+    """(status, body) for a backend request that got no usable response"""
+    if isinstance(error, BackendTimeout):
+        return 504, {
+            'success': False,
+            'error': 'Backend timed out',
+            'message': str(error)
+        }
+    return 502, {
+        'success': False,
+        'error': 'Invalid backend response',
+        'message': str(error)
+    }
+
+
+def _check_values(samples, skip_incomplete=False):
+    """
+    Convert every field of every sample like app.py does
+    Samples with missing fields are skipped when skip_incomplete, since
+    /batch-predict reports those per sample
+    Raises:
+        ValueError, TypeError: A value is not a number
+    """
+    for sample in samples:
+        if skip_incomplete and any(field not in sample for field in FEATURE_NAMES):
+            continue
+        for field in FEATURE_NAMES:
+            float(sample[field])
+
+
+def proxy(path, key=None):
+    """
+    Relay the current request to the backend owning `key` (round-robin if None)
+    and return its response as is, failing over while backends are unreachable.
+    A timed-out request is not retried: it gets a 504 and the backend stays in the ring.
+    Accept-Encoding is forwarded, so compressed backend responses pass through
+    """
+    body = request.get_data()
+    headers = {'Content-Type': request.content_type or 'application/json'}
+    if 'Accept-Encoding' in request.headers:
+        headers['Accept-Encoding'] = request.headers['Accept-Encoding']
+
+    for _ in range(len(pool.urls)):
+        backend = pool.route(key)
+        if backend is None:
+            break
+        try:
+            status, backend_headers, data = pool.request(backend, request.method, path,
+                                                         body or None, headers)
+        except BackendUnavailable:
+            pool.mark_down(backend)
+            continue
+        except BackendError as e:
+            status, body = _failure(e)
+            return jsonify(body), status
+
+        response = Response(data, status=status)
+        for name in PROXY_HEADERS:
+            if name in backend_headers:
+                response.headers[name] = backend_headers[name]
+        response.headers['X-Backend'] = backend
+        return response
+    return _no_backend()
+
+
+def _run_shard(path, backend, indices, samples, result_key):
+    """
+    Send one shard's sub-batch to its backend
+    Returns:
+        tuple: (results numbered in request order, other top-level response fields,
+            (status, body) of a failed request or None), or None if the backend is down
+    """
+    try:
+        status, body = pool.send(backend, 'POST', path, {'samples': [samples[i] for i in indices]})
+    except BackendUnavailable:
+        pool.mark_down(backend)
+        return None
+    except BackendError as e:
+        return None, {}, _failure(e)
+
+    if status != 200 or not body.get('success'):
+        return None, {}, (status, body)
+
+    # Backends number samples within the sub-batch; map back to request order
+    results = body.pop(result_key)
+    for result in results:
+        result['sample_index'] = indices[result['sample_index']]
+    extra = {key: value for key, value in body.items()
+             if key not in ('success', 'total_samples', 'timestamp')}
+    return results, extra, None
+
+
+def fan_out(path, samples, result_key):
+    """
+    Split a batch by owning backend, run the shards in parallel and merge the
+    results in request order. When a backend turns out to be down, its samples
+    are routed again one by one, so each motor moves to its new ring owner.
+    Any other shard failure (an error status, a timeout) fails the whole batch,
+    as it would on a single backend.
+    Returns:
+        tuple: (results, samples sent to each backend, other top-level response fields,
+            (status, body) of the failure, or None)
+    """
+    results = [None] * len(samples)
+    shard_sizes = {}
+    extra = {}
+    pending = list(range(len(samples)))
+
+    # Every failed round removes a backend from the ring, so this terminates
+    for _ in range(len(pool.urls)):
+        shards = {}
+        for idx in pending:
+            shards.setdefault(pool.route(_motor_id(samples[idx])), []).append(idx)
+        if None in shards:
+            break
+
+        futures = {backend: executor.submit(_run_shard, path, backend, indices, samples, result_key)
+                   for backend, indices in shards.items()}
+        pending = []
+        error = None
+        for backend, future in futures.items():
+            outcome = future.result()
+            if outcome is None:
+                pending.extend(shards[backend])
+                continue
+            shard_results, shard_extra, shard_error = outcome
+            if shard_error:
+                error = error or shard_error
+                continue
+            for result in shard_results:
+                results[result['sample_index']] = result
+            shard_sizes[backend] = shard_sizes.get(backend, 0) + len(shards[backend])
+            extra.update(shard_extra)
+        if error:
+            return results, shard_sizes, extra, error
+        if not pending:
+            break
+
+    if pending:
+        return results, shard_sizes, extra, (503, {
+            'success': False,
+            'error': 'No backend available'
+        })
+    return results, shard_sizes, extra, None
+
+
+@app.route('/health', methods=['GET'])
+def health_check():
+    """Router health: healthy while at least one backend is in the ring"""
+    healthy = pool.ring.nodes
+    return jsonify({
+        'status': 'healthy' if healthy else 'unhealthy',
+        'healthy_backends': len(healthy),
+        'backends': [{'url': url, **pool.status[url]} for url in pool.urls],
+        'timestamp': datetime.now().isoformat()
+    }), 200 if healthy else 503
+
+
+@app.route('/predict', methods=['POST'])
+def predict():
+    """Forward a single prediction to the backend that owns its motor_id"""
+    try:
+        return proxy('/predict', _motor_id(request.get_json(silent=True)))
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Prediction failed',
+            'message': str(e)
+        }), 500
+
+
+@app.route('/batch-predict', methods=['POST'])
+def batch_predict():
+    """
+    Split a batch by owning backend, run the shards in parallel and
+    merge the predictions back in request order
+    """
+    try:
+        data = request.get_json()
+        samples = data.get('samples', [])
+
+        if not samples:
+            return jsonify({
+                'success': False,
+                'error': 'No samples provided'
+            }), 400
+
+        _check_values(samples, skip_incomplete=True)
+
+        if not pool.ring.nodes:
+            return _no_backend()
+
+        predictions, shard_sizes, _, error = fan_out('/batch-predict', samples, 'predictions')
+        if error:
+            status, body = error
+            return jsonify(body), status
+
+        return jsonify({
+            'success': True,
+            'total_samples': len(samples),
+            'predictions': predictions,
+            'shards': shard_sizes,
+            'timestamp': datetime.now().isoformat()
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Batch prediction failed',
+            'message': str(e)
+        }), 500
+
+
+@app.route('/explain', methods=['POST'])
+def explain_prediction():
+    """
+    Explanations with motor affinity: single samples go to the owner of their
+    motor_id, {"samples": [...]} batches are sharded like /batch-predict
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict) or 'samples' not in data:
+            return proxy('/explain', _motor_id(data))
+
+        samples = data['samples']
+        if not samples:
+            return jsonify({
+                'success': False,
+                'error': 'No samples provided'
+            }), 400
+
+        for idx, sample in enumerate(samples):
+            missing_fields = [field for field in FEATURE_NAMES if field not in sample]
+            if missing_fields:
+                return jsonify({
+                    'success': False,
+                    'error': 'Missing required fields',
+                    'sample_index': idx,
+                    'missing_fields': missing_fields
+                }), 400
+        _check_values(samples)
+
+        if not pool.ring.nodes:
+            return _no_backend()
+
+        explanations, shard_sizes, extra, error = fan_out('/explain', samples, 'explanations')
+        if error:
+            status, body = error
+            return jsonify(body), status
+
+        return jsonify({
+            'success': True,
+            'total_samples': len(samples),
+            **extra,
+            'explanations': explanations,
+            'shards': shard_sizes,
+            'timestamp': datetime.now().isoformat()
+        }), 200
+
+    except (ValueError, TypeError) as e:
+        return jsonify({
+            'success': False,
+            'error': 'Invalid input values',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Explanation failed',
+            'message': str(e)
+        }), 500
+
+
+@app.route('/sweep', methods=['POST'])
+def sweep_predict():
+    """Forward a sweep to the backend that owns its spec, so repeats hit that backend's cache"""
+    try:
+        data = request.get_json(silent=True)
+        key = None if data is None else json.dumps(data, sort_keys=True)
+        return proxy('/sweep', key)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Sweep failed',
+            'message': str(e)
+        }), 500
+
+
+@app.route('/drift', methods=['GET'])
+def drift_report():
+    """
+    Drift reports of every healthy backend. Each backend only sees the motors
+    routed to it, so reports are per backend rather than merged
+    """
+    backends = pool.ring.nodes
+    futures = {backend: executor.submit(pool.send, backend, 'GET', '/drift')
+               for backend in backends}
+
+    reports = {}
+    for backend, future in futures.items():
+        try:
+            status, body = future.result()
+        except BackendUnavailable:
+            pool.mark_down(backend)
+            continue
+        except BackendError:
+            continue
+        if status == 200:
+            body.pop('success', None)
+            reports[backend] = body
+
+    if not reports:
+        return _no_backend()
+
+    return jsonify({
+        'success': True,
+        'window_samples': sum(report['window_samples'] for report in reports.values()),
+        'backends': reports,
+        'timestamp': datetime.now().isoformat()
+    }), 200
+
+
+@app.route('/model-info', methods=['GET'])
+def model_info():
+    """Model information from any healthy backend"""
+    return proxy('/model-info')
+
+
+if __name__ == '__main__':
+    app.run(
+        host=os.environ.get('HOST', '0.0.0.0'),
+        port=int(os.environ.get('ROUTER_PORT', 8000)),
+        debug=False
+    )
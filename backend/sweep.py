@@ -0,0 +1,150 @@
+"""
+Operating-point sweeps ("what-if" grids) for the Flask backend
+Builds a 1-D or 2-D feature grid, scores it in one batched pass and caches the result
+"""
+
+import base64
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+MAX_SWEEP_STEPS = 1000
+MAX_SWEEP_POINTS = 1_000_000
+SWEEP_FORMATS = ('binary', 'json')
+
+
+def model_version(path):
+    """Short content hash of a saved model, used to key cached results"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def _finite(value, name):
+    """Convert a request value to float, rejecting NaN and infinity"""
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError(f'{name} must be a finite number, got {value}')
+    return value
+
+
+def parse_sweep_spec(data, feature_names):
+    """
+    Validate a sweep request and normalise it into a hashable spec
+    Args:
+        data: Request JSON with 'base', 'axes' and optional 'format' (default 'binary')
+        feature_names: Model input features, in order
+    Returns:
+        tuple: (base values, axes as (feature, start, stop, steps), format)
+    Raises:
+        ValueError: The request is malformed or the grid is too large
+    """
+    base = data.get('base')
+    if not isinstance(base, dict):
+        raise ValueError("'base' must be an object with all input features")
+    missing_fields = [field for field in feature_names if field not in base]
+    if missing_fields:
+        raise ValueError(f'Missing base fields: {missing_fields}')
+
+    axes = data.get('axes')
+    if not isinstance(axes, list) or not 1 <= len(axes) <= 2:
+        raise ValueError("'axes' must be a list of one or two axes")
+
+    parsed_axes = []
+    points = 1
+    for axis in axes:
+        feature = axis.get('feature')
+        if feature not in feature_names:
+            raise ValueError(f'Unknown axis feature: {feature}')
+        steps = int(axis.get('steps', 0))
+        if not 2 <= steps <= MAX_SWEEP_STEPS:
+            raise ValueError(f'steps must be between 2 and {MAX_SWEEP_STEPS}')
+        parsed_axes.append((feature, _finite(axis['start'], f'{feature} start'),
+                            _finite(axis['stop'], f'{feature} stop'), steps))
+        points *= steps
+
+    if len({axis[0] for axis in parsed_axes}) != len(parsed_axes):
+        raise ValueError('Axes must sweep different features')
+    if points > MAX_SWEEP_POINTS:
+        raise ValueError(f'Sweep has {points} points, the limit is {MAX_SWEEP_POINTS}')
+
+    sweep_format = data.get('format', 'binary')
+    if sweep_format not in SWEEP_FORMATS:
+        raise ValueError(f'format must be one of {list(SWEEP_FORMATS)}')
+
+    base_values = tuple(_finite(base[field], f'base {field}') for field in feature_names)
+    return base_values, tuple(parsed_axes), sweep_format
+
+
+def run_sweep(model, scaler, spec, feature_names):
+    """
+    Score every point of the sweep grid in a single scaler and model pass
+    Returns:
+        tuple: (list of axis value arrays, predictions shaped like the grid)
+    """
+    base_values, axes, _ = spec
+    axis_values = [np.linspace(start, stop, steps) for _, start, stop, steps in axes]
+    grids = np.meshgrid(*axis_values, indexing='ij')
+
+    features = np.empty((grids[0].size, len(feature_names)))
+    features[:] = base_values
+    for (feature, _, _, _), grid in zip(axes, grids):
+        features[:, feature_names.index(feature)] = grid.ravel()
+
+    predictions = model.predict(scaler.transform(features))
+    return axis_values, np.asarray(predictions, dtype=np.float64).reshape(grids[0].shape)
+
+
+def encode_array(array, sweep_format, dtype, decimals=None):
+    """Encode a grid as nested JSON lists or as base64 of its row-major bytes"""
+    if sweep_format == 'binary':
+        return {
+            'dtype': np.dtype(dtype).name,
+            'encoding': 'base64',
+            'data': base64.b64encode(
+                np.ascontiguousarray(array, dtype=np.dtype(dtype).newbyteorder('<'))
+            ).decode('ascii')
+        }
+    if decimals is not None:
+        array = np.round(array, decimals)
+    return array.tolist()
+
+
+class SweepCache:
+    """Thread-safe LRU cache of serialised sweep responses, bounded by total size"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, value):
+        """Store a bytes value; values larger than the whole cache are not kept"""
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.size -= len(self._entries.pop(key))
+            self._entries[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
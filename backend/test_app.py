@@ -7,6 +7,7 @@ import pytest
 import json
 import sys
 import os
+import threading
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -234,5 +235,478 @@ def test_prediction_consistency(client):
     # Predictions should be identical
     assert abs(data1['prediction'] - data2['prediction']) < 1e-6
 
+def test_gzip_request_body(client):
+    """Test that gzip-encoded request bodies are decoded transparently"""
+    import gzip
+
+    payload = {
+        'ambient': 25.5,
+        'coolant': 22.3,
+        'u_d': 0.45,
+        'u_q': 0.38,
+        'motor_speed': 1500,
+        'i_d': 12.5,
+        'i_q': 15.2
+    }
+
+    response = client.post(
+        '/predict',
+        data=gzip.compress(json.dumps(payload).encode('utf-8')),
+        content_type='application/json',
+        headers={'Content-Encoding': 'gzip'}
+    )
+
+    assert response.status_code == 200
+    assert json.loads(response.data)['success'] is True
+
+def test_decompression_bomb_rejected(client):
+    """Test that oversized decompressed bodies are rejected"""
+    import gzip
+    from content_encoding import MAX_DECOMPRESSED_SIZE
+
+    bomb = gzip.compress(b' ' * (MAX_DECOMPRESSED_SIZE + 1))
+
+    response = client.post(
+        '/batch-predict',
+        data=bomb,
+        content_type='application/json',
+        headers={'Content-Encoding': 'gzip'}
+    )
+
+    assert response.status_code == 413
+    assert json.loads(response.data)['success'] is False
+
+def test_unsupported_content_encoding(client):
+    """Test that unknown request encodings are rejected"""
+    response = client.post(
+        '/predict',
+        data=b'{}',
+        content_type='application/json',
+        headers={'Content-Encoding': 'br'}
+    )
+
+    assert response.status_code == 415
+
+def test_response_compression_negotiated(client):
+    """Test that large responses are compressed and small ones are not"""
+    import gzip
+
+    sample = {
+        'ambient': 25.5,
+        'coolant': 22.3,
+        'u_d': 0.45,
+        'u_q': 0.38,
+        'motor_speed': 1500,
+        'i_d': 12.5,
+        'i_q': 15.2
+    }
+
+    response = client.post(
+        '/batch-predict',
+        data=json.dumps({'samples': [sample] * 50}),
+        content_type='application/json',
+        headers={'Accept-Encoding': 'gzip'}
+    )
+
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    data = json.loads(gzip.decompress(response.data))
+    assert data['total_samples'] == 50
+
+    # A single prediction is below the threshold and stays uncompressed
+    response = client.post(
+        '/predict',
+        data=json.dumps(sample),
+        content_type='application/json',
+        headers={'Accept-Encoding': 'gzip'}
+    )
+
+    assert 'Content-Encoding' not in response.headers
+    assert json.loads(response.data)['success'] is True
+
+def test_zstd_round_trip(client):
+    """Test zstd request decoding and zstd response compression together"""
+    zstandard = pytest.importorskip('zstandard')
+
+    sample = {
+        'ambient': 25.5,
+        'coolant': 22.3,
+        'u_d': 0.45,
+        'u_q': 0.38,
+        'motor_speed': 1500,
+        'i_d': 12.5,
+        'i_q': 15.2
+    }
+
+    response = client.post(
+        '/batch-predict',
+        data=zstandard.ZstdCompressor().compress(json.dumps({'samples': [sample] * 50}).encode('utf-8')),
+        content_type='application/json',
+        headers={'Content-Encoding': 'zstd', 'Accept-Encoding': 'zstd'}
+    )
+
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'zstd'
+    data = json.loads(zstandard.ZstdDecompressor().decompressobj().decompress(response.data))
+    assert data['total_samples'] == 50
+
+def test_streamed_response_flushed_per_chunk():
+    """Test that every chunk of a streamed response can be decoded on arrival"""
+    import zlib
+    from flask import Flask
+    import content_encoding
+
+    chunks = [f'{{"row": {i}, "pad": "{"x" * 200}"}}\n'.encode('utf-8') for i in range(5)]
+    stream_app = Flask(__name__)
+    content_encoding.init_app(stream_app)
+
+    @stream_app.route('/stream')
+    def stream():
+        return stream_app.response_class(iter(chunks), mimetype='application/x-ndjson')
+
+    with stream_app.test_client() as stream_client:
+        response = stream_client.get('/stream', headers={'Accept-Encoding': 'gzip'}, buffered=False)
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Content-Length' not in response.headers
+
+        decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        pieces = list(response.response)
+        # One compressed piece per chunk, each decodable without the rest
+        for chunk, piece in zip(chunks, pieces):
+            assert decoder.decompress(piece) == chunk
+        assert decoder.decompress(b''.join(pieces[len(chunks):])) == b''
+        assert decoder.eof
+
+def test_admin_endpoints_disabled_without_token(client, monkeypatch):
+    """Test that diagnostics are unavailable when no admin token is configured"""
+    import diagnostics
+    monkeypatch.setattr(diagnostics, 'ADMIN_TOKEN', '')
+
+    response = client.post('/admin/profile?seconds=0.1')
+    assert response.status_code == 403
+
+def test_admin_profile_collapsed_stacks(client, monkeypatch):
+    """Test that the profiler returns flamegraph-ready collapsed stacks"""
+    import diagnostics
+    monkeypatch.setattr(diagnostics, 'ADMIN_TOKEN', 'secret')
+
+    response = client.post('/admin/profile?seconds=0.1', headers={'X-Admin-Token': 'wrong'})
+    assert response.status_code == 401
+
+    # The profiler skips its own thread, so give it a known busy one to sample
+    stop = threading.Event()
+
+    def busy_profiler_target():
+        while not stop.is_set():
+            sum(range(1000))
+
+    worker = threading.Thread(target=busy_profiler_target, daemon=True)
+    worker.start()
+    try:
+        response = client.post(
+            '/admin/profile?seconds=0.2&interval_ms=1',
+            headers={'X-Admin-Token': 'secret'}
+        )
+    finally:
+        stop.set()
+        worker.join()
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    counts = {}
+    for line in response.get_data(as_text=True).splitlines():
+        stack, count = line.rsplit(' ', 1)
+        counts[stack] = int(count)
+    busy = [count for stack, count in counts.items() if 'busy_profiler_target' in stack]
+    assert busy and all(count > 0 for count in busy)
+
+def test_slow_request_capture(client, monkeypatch):
+    """Test that slow requests are recorded with stage timings and payload shape only"""
+    import diagnostics
+    monkeypatch.setattr(diagnostics, 'ADMIN_TOKEN', 'secret')
+    headers = {'X-Admin-Token': 'secret'}
+
+    client.delete('/admin/slow-requests', headers=headers)
+    for invalid in ('nan', 'inf', -5):
+        response = client.put('/admin/slow-requests', json={'threshold_ms': invalid}, headers=headers)
+        assert response.status_code == 400
+    assert diagnostics.slow_request_threshold_ms is None
+
+    response = client.put('/admin/slow-requests', json={'threshold_ms': 0}, headers=headers)
+    assert response.status_code == 200
+
+    try:
+        client.post('/predict', json={
+            'ambient': 25.5,
+            'coolant': 22.3,
+            'u_d': 0.45,
+            'u_q': 0.38,
+            'motor_speed': 1500,
+            'i_d': 12.5,
+            'i_q': 15.2
+        })
+        data = json.loads(client.get('/admin/slow-requests', headers=headers).data)
+    finally:
+        diagnostics.set_slow_request_threshold(None)
+        diagnostics.slow_requests.clear()
+
+    record = next(r for r in data['requests'] if r['path'] == '/predict')
+    assert set(record['stages_ms']) >= {'parse', 'validate', 'scale', 'predict', 'respond'}
+    assert record['payload_shape']['ambient'] == 'float'
+    assert '25.5' not in json.dumps(record)
+
+def test_explain_requires_tree_model(client, monkeypatch):
+    """Test that /explain reports unsupported models"""
+    import numpy as np
+    from sklearn.linear_model import LinearRegression
+    import app as app_module
+
+    X = np.random.default_rng(0).random((50, 7))
+    monkeypatch.setattr(app_module, 'model', LinearRegression().fit(X, X[:, 0]))
+    monkeypatch.setattr(app_module, 'explainer', None)
+
+    response = client.post('/explain', json={
+        'ambient': 25.5,
+        'coolant': 22.3,
+        'u_d': 0.45,
+        'u_q': 0.38,
+        'motor_speed': 1500,
+        'i_d': 12.5,
+        'i_q': 15.2
+    })
+
+    assert response.status_code == 501
+    assert json.loads(response.data)['success'] is False
+
+def test_explain_tree_model(client, monkeypatch):
+    """Test per-feature contributions for single and batch requests"""
+    import numpy as np
+    from sklearn.tree import DecisionTreeRegressor
+    import app as app_module
+
+    rng = np.random.default_rng(0)
+    X = rng.random((300, 7))
+    tree = DecisionTreeRegressor(max_depth=6, random_state=42).fit(X, X[:, 0] * X[:, 4])
+    monkeypatch.setattr(app_module, 'model', tree)
+    # Built lazily from the patched model on the first request
+    monkeypatch.setattr(app_module, 'explainer', None)
+
+    sample = {
+        'ambient': 25.5,
+        'coolant': 22.3,
+        'u_d': 0.45,
+        'u_q': 0.38,
+        'motor_speed': 1500,
+        'i_d': 12.5,
+        'i_q': 15.2
+    }
+
+    response = client.post('/explain', json=sample)
+    assert response.status_code == 200
+    assert app_module.explainer is not None
+
+    data = json.loads(response.data)
+    assert set(data['contributions']) == set(sample)
+    assert abs(data['base_value'] + sum(data['contributions'].values()) - data['prediction']) < 1e-3
+
+    predicted = client.post('/predict', json=sample)
+    assert abs(json.loads(predicted.data)['prediction'] - data['prediction']) < 1e-6
+
+    response = client.post('/explain', json={'samples': [sample, sample]})
+    data = json.loads(response.data)
+    assert data['total_samples'] == 2
+    assert [e['sample_index'] for e in data['explanations']] == [0, 1]
+
+    response = client.post('/explain', json={'samples': [{'ambient': 25.5}]})
+    assert response.status_code == 400
+
+def test_drift_report_counts_out_of_range(client):
+    """Test that /drift reports live inputs outside the training range"""
+    before = json.loads(client.get('/drift').data)
+    assert before['success'] is True
+    assert set(before['features']) == {
+        'ambient', 'coolant', 'u_d', 'u_q', 'motor_speed', 'i_d', 'i_q'
+    }
+
+    client.post('/predict', json={
+        'ambient': 25.5,
+        'coolant': 22.3,
+        'u_d': 0.45,
+        'u_q': 0.38,
+        'motor_speed': 99999,
+        'i_d': 12.5,
+        'i_q': 15.2
+    })
+
+    after = json.loads(client.get('/drift').data)
+    motor_speed = after['features']['motor_speed']
+    assert after['window_samples'] == before['window_samples'] + 1
+    assert motor_speed['out_of_range']['above_max'] == \
+        before['features']['motor_speed']['out_of_range']['above_max'] + 1
+
+    # Rejected requests are not counted
+    response = client.post('/predict', json={
+        'ambient': 'nan',
+        'coolant': 22.3,
+        'u_d': 0.45,
+        'u_q': 0.38,
+        'motor_speed': 1500,
+        'i_d': 12.5,
+        'i_q': 15.2
+    })
+    assert response.status_code == 400
+    assert json.loads(client.get('/drift').data)['window_samples'] == after['window_samples']
+
+def test_sweep_grid(client):
+    """Test a 2-D operating-point sweep against single predictions"""
+    import app as app_module
+    app_module.sweep_cache.clear()
+
+    base = {
+        'ambient': 25.5,
+        'coolant': 22.3,
+        'u_d': 0.45,
+        'u_q': 0.38,
+        'motor_speed': 1500,
+        'i_d': 12.5,
+        'i_q': 15.2
+    }
+    payload = {
+        'base': base,
+        'axes': [
+            {'feature': 'motor_speed', 'start': 0, 'stop': 3000, 'steps': 4},
+            {'feature': 'i_q', 'start': 0, 'stop': 40, 'steps': 3}
+        ],
+        'format': 'json'
+    }
+
+    response = client.post('/sweep', json=payload)
+    assert response.status_code == 200
+    assert response.headers['X-Sweep-Cache'] == 'miss'
+
+    data = json.loads(response.data)
+    assert data['shape'] == [4, 3]
+    assert data['axes'][0]['values'] == [0.0, 1000.0, 2000.0, 3000.0]
+    assert len(data['predictions']) == 4 and len(data['predictions'][0]) == 3
+
+    single = json.loads(client.post('/predict', json=dict(base, motor_speed=2000, i_q=20)).data)
+    assert abs(data['predictions'][2][1] - single['prediction']) < 1e-4
+    assert data['risk_legend'][data['risk_levels'][2][1]] == single['risk_level']
+
+    response = client.post('/sweep', json=payload)
+    assert response.headers['X-Sweep-Cache'] == 'hit'
+    assert json.loads(response.data)['computed_at'] == data['computed_at']
+
+def test_sweep_binary_format(client):
+    """Test that binary sweeps (the default) decode to the same grid as JSON sweeps"""
+    import base64
+    import numpy as np
+
+    payload = {
+        'base': {
+            'ambient': 25.5,
+            'coolant': 22.3,
+            'u_d': 0.45,
+            'u_q': 0.38,
+            'motor_speed': 1500,
+            'i_d': 12.5,
+            'i_q': 15.2
+        },
+        'axes': [{'feature': 'ambient', 'start': 15, 'stop': 35, 'steps': 5}]
+    }
+
+    as_json = json.loads(client.post('/sweep', json=dict(payload, format='json')).data)
+    as_binary = json.loads(client.post('/sweep', json=payload).data)
+
+    assert as_binary['format'] == 'binary'
+    decoded = np.frombuffer(base64.b64decode(as_binary['predictions']['data']), dtype='<f4')
+    assert as_binary['predictions']['dtype'] == 'float32'
+    assert np.allclose(decoded, as_json['predictions'], atol=1e-4)
+
+def test_sweep_invalid_spec(client):
+    """Test sweep validation errors"""
+    base = {
+        'ambient': 25.5,
+        'coolant': 22.3,
+        'u_d': 0.45,
+        'u_q': 0.38,
+        'motor_speed': 1500,
+        'i_d': 12.5,
+        'i_q': 15.2
+    }
+    invalid = [
+        {'base': base, 'axes': []},
+        {'base': base, 'axes': [{'feature': 'torque', 'start': 0, 'stop': 1, 'steps': 10}]},
+        {'base': base, 'axes': [{'feature': 'i_q', 'start': 0, 'stop': 1, 'steps': 5000}]},
+        {'base': {'ambient': 25.5}, 'axes': [{'feature': 'i_q', 'start': 0, 'stop': 1, 'steps': 10}]},
+        {'base': base, 'axes': [{'feature': 'i_q', 'start': 'nan', 'stop': 1, 'steps': 10}]},
+        {'base': base, 'axes': [{'feature': 'i_q', 'start': 0, 'stop': 'inf', 'steps': 10}]},
+        {'base': dict(base, ambient='nan'), 'axes': [{'feature': 'i_q', 'start': 0, 'stop': 1, 'steps': 10}]}
+    ]
+
+    for payload in invalid:
+        response = client.post('/sweep', json=payload)
+        assert response.status_code == 400
+        assert json.loads(response.data)['success'] is False
+
+def test_sweep_cached_compressed(client):
+    """Test that compressed sweep bodies are cached per encoding, not recompressed"""
+    import gzip
+    import app as app_module
+    app_module.sweep_cache.clear()
+
+    payload = {
+        'base': {
+            'ambient': 25.5,
+            'coolant': 22.3,
+            'u_d': 0.45,
+            'u_q': 0.38,
+            'motor_speed': 1500,
+            'i_d': 12.5,
+            'i_q': 15.2
+        },
+        'axes': [{'feature': 'motor_speed', 'start': 0, 'stop': 3000, 'steps': 200}],
+        'format': 'json'
+    }
+
+    first = client.post('/sweep', json=payload, headers={'Accept-Encoding': 'gzip'})
+    second = client.post('/sweep', json=payload, headers={'Accept-Encoding': 'gzip'})
+    assert second.headers['X-Sweep-Cache'] == 'hit'
+    assert second.headers['Content-Encoding'] == 'gzip'
+    assert second.data == first.data
+    assert json.loads(gzip.decompress(second.data))['shape'] == [200]
+
+    # A client without Accept-Encoding gets its own uncompressed entry
+    plain = client.post('/sweep', json=payload)
+    assert plain.headers['X-Sweep-Cache'] == 'miss'
+    assert 'Content-Encoding' not in plain.headers
+    assert json.loads(plain.data)['predictions'] == json.loads(gzip.decompress(first.data))['predictions']
+
+def test_sweep_cache_bounded_by_bytes():
+    """Test that the sweep cache evicts least recently used entries by total size"""
+    from sweep import SweepCache
+
+    cache = SweepCache(max_bytes=100)
+    cache.put('a', b'x' * 40)
+    cache.put('b', b'x' * 40)
+    cache.get('a')
+    cache.put('c', b'x' * 40)
+
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    assert cache.size == 80
+
+    cache.put('huge', b'x' * 101)
+    assert cache.get('huge') is None and cache.size == 80
+
+def test_vectorized_risk_levels_match():
+    """Test that the vectorized risk bands agree with determine_risk_level"""
+    import numpy as np
+    from app import RISK_LEVELS, RISK_THRESHOLDS, determine_risk_level
+
+    values = np.linspace(-0.5, 1.5, 2001)
+    codes = np.digitize(values, RISK_THRESHOLDS)
+    assert [RISK_LEVELS[c] for c in codes] == [determine_risk_level(v) for v in values]
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
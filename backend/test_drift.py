@@ -0,0 +1,101 @@
+"""
+Unit tests for input drift monitoring
+Run with: pytest test_drift.py
+"""
+
+import sys
+import os
+
+import numpy as np
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from drift import DriftMonitor, bin_counts, build_reference
+
+FEATURES = ['ambient', 'coolant', 'u_d', 'u_q', 'motor_speed', 'i_d', 'i_q']
+
+@pytest.fixture
+def reference():
+    """Reference histograms of uniformly distributed scaled features"""
+    X = np.random.default_rng(0).random((5000, len(FEATURES)))
+    return build_reference(X, FEATURES)
+
+def test_bin_counts_out_of_range(reference):
+    """Test that values outside the training range land in the edge bins"""
+    X = np.full((3, len(FEATURES)), 0.5)
+    X[0, 4] = -0.2
+    X[1, 4] = 1.5
+
+    counts = bin_counts(X, reference['edges'])
+
+    assert counts.shape == (len(FEATURES), 22)
+    assert (counts.sum(axis=1) == 3).all()
+    assert counts[4, 0] == 1 and counts[4, -1] == 1
+    assert counts[0, 0] == 0 and counts[0, -1] == 0
+
+def test_same_distribution_is_stable(reference):
+    """Test that traffic from the training distribution is not flagged"""
+    monitor = DriftMonitor(reference)
+    monitor.update(np.random.default_rng(1).random((5000, len(FEATURES))))
+
+    report = monitor.report()
+
+    assert report['window_samples'] == 5000
+    for entry in report['features'].values():
+        assert entry['status'] == 'stable'
+        assert entry['psi'] < 0.1
+
+def test_shifted_feature_is_flagged(reference):
+    """Test that a shifted feature drifts while the others stay stable"""
+    X = np.random.default_rng(1).random((5000, len(FEATURES)))
+    X[:, 4] = X[:, 4] * 0.5 + 0.7
+
+    monitor = DriftMonitor(reference)
+    for batch in np.array_split(X, 50):
+        monitor.update(batch)
+    report = monitor.report()['features']
+
+    assert report['motor_speed']['status'] == 'drift'
+    assert report['motor_speed']['out_of_range']['above_max'] > 0
+    assert report['ambient']['status'] == 'stable'
+
+def test_without_reference_counts_out_of_range():
+    """Test that out-of-range inputs are still counted without a reference"""
+    monitor = DriftMonitor(feature_names=FEATURES)
+    monitor.update(np.array([[-1.0, 0.5, 0.5, 0.5, 2.0, 0.5, 0.5]]))
+
+    report = monitor.report()
+
+    assert report['reference_loaded'] is False
+    assert report['features']['ambient']['out_of_range']['below_min'] == 1
+    assert report['features']['motor_speed']['out_of_range']['above_max'] == 1
+    assert 'psi' not in report['features']['ambient']
+
+def test_training_extremes_are_in_range(reference):
+    """Test that the scaled training min/max are not counted as out of range"""
+    import joblib
+    scaler = joblib.load(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'transform.save'))
+    extremes = scaler.transform(np.vstack([scaler.data_min_, scaler.data_max_]))
+
+    counts = bin_counts(extremes, reference['edges'])
+    assert (counts[:, 0] == 0).all() and (counts[:, -1] == 0).all()
+
+    monitor = DriftMonitor(reference)
+    monitor.update(extremes)
+    assert (monitor.totals[:, 0] == 0).all() and (monitor.totals[:, -1] == 0).all()
+
+def test_non_finite_rows_are_skipped(reference):
+    """Test that rows containing NaN or inf are not counted"""
+    monitor = DriftMonitor(reference)
+    X = np.full((3, len(FEATURES)), 0.5)
+    X[0, 2] = np.nan
+    X[1, 5] = np.inf
+
+    monitor.update(X)
+    monitor.update(np.repeat(X, 10, axis=0))
+    assert (monitor.totals.sum(axis=1) == 11).all()
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
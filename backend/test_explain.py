@@ -0,0 +1,136 @@
+"""
+Unit tests for TreeSHAP feature attribution
+Run with: pytest test_explain.py
+"""
+
+import itertools
+import math
+import sys
+import os
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.tree import DecisionTreeRegressor
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from explain import TreeExplainer, build_explainer
+
+N_FEATURES = 7
+
+@pytest.fixture(scope='module')
+def training_data():
+    """Synthetic scaled features with interactions between inputs"""
+    rng = np.random.default_rng(0)
+    X = rng.random((500, N_FEATURES))
+    y = 3 * X[:, 0] + np.sin(5 * X[:, 4]) + X[:, 6] * X[:, 1]
+    return X, y
+
+def expected_value(tree, x, subset):
+    """Path-dependent E[f(x) | x_S] by direct recursion over the tree"""
+    def recurse(node):
+        if tree.children_left[node] == -1:
+            return tree.value[node, 0, 0]
+        left, right = tree.children_left[node], tree.children_right[node]
+        if tree.feature[node] in subset:
+            go_left = np.float32(x[tree.feature[node]]) <= tree.threshold[node]
+            return recurse(left if go_left else right)
+        cover = tree.weighted_n_node_samples
+        return (recurse(left) * cover[left] + recurse(right) * cover[right]) / cover[node]
+    return recurse(0)
+
+def brute_force_shap(tree, x):
+    """Shapley values by enumerating every feature subset"""
+    phi = np.zeros(N_FEATURES)
+    for i in range(N_FEATURES):
+        others = [j for j in range(N_FEATURES) if j != i]
+        for k in range(N_FEATURES):
+            weight = math.factorial(k) * math.factorial(N_FEATURES - k - 1) / math.factorial(N_FEATURES)
+            for subset in itertools.combinations(others, k):
+                with_i = expected_value(tree, x, set(subset) | {i})
+                without_i = expected_value(tree, x, set(subset))
+                phi[i] += weight * (with_i - without_i)
+    return phi
+
+def test_matches_brute_force(training_data):
+    """Test that contributions equal exact Shapley values for a decision tree"""
+    X, y = training_data
+    model = DecisionTreeRegressor(max_depth=6, min_samples_leaf=5, random_state=42).fit(X, y)
+    explainer = TreeExplainer(model)
+
+    rows = np.random.default_rng(1).random((3, N_FEATURES))
+    contributions = explainer.shap_values(rows)
+
+    for row, phi in zip(rows, contributions):
+        np.testing.assert_allclose(phi, brute_force_shap(model.tree_, row), atol=1e-10)
+
+def test_forest_additivity(training_data):
+    """Test that base value plus contributions reproduces forest predictions"""
+    X, y = training_data
+    model = RandomForestRegressor(
+        n_estimators=20, max_depth=15, min_samples_split=10, random_state=42
+    ).fit(X, y)
+    explainer = TreeExplainer(model)
+
+    contributions = explainer.shap_values(X[:50])
+    np.testing.assert_allclose(
+        explainer.expected_value + contributions.sum(axis=1),
+        model.predict(X[:50]),
+        atol=1e-10
+    )
+
+def test_batch_matches_single_rows(training_data):
+    """Test that batched explanations equal row-by-row explanations"""
+    X, y = training_data
+    explainer = TreeExplainer(DecisionTreeRegressor(max_depth=8, random_state=42).fit(X, y))
+
+    batch = explainer.shap_values(X[:20])
+    single = np.vstack([explainer.shap_values(X[i:i + 1]) for i in range(20)])
+    np.testing.assert_allclose(batch, single)
+
+def test_leaf_blocks_match_single_block(training_data, monkeypatch):
+    """Test that splitting the leaves into blocks does not change the result"""
+    import explain
+    X, y = training_data
+    model = RandomForestRegressor(n_estimators=5, max_depth=6, random_state=42).fit(X, y)
+    explainer = TreeExplainer(model)
+    monkeypatch.setattr(explain, 'PATTERN_MIN_ROWS', 10 ** 9)
+
+    whole = explainer.shap_values(X[:30])
+    monkeypatch.setattr(explain, 'LEAF_BLOCK', 7)
+    monkeypatch.setattr(explain, 'CHUNK_ELEMENTS', 20)
+    assert explainer.n_leaves > 7
+    np.testing.assert_allclose(explainer.shap_values(X[:30]), whole, atol=1e-12)
+
+def test_shared_patterns_match_dense_kernel(training_data, monkeypatch):
+    """Test that the pattern-sharing batch kernel matches the dense kernel"""
+    import explain
+    X, y = training_data
+    model = RandomForestRegressor(n_estimators=10, max_depth=10, random_state=42).fit(X, y)
+    explainer = TreeExplainer(model)
+    rows = np.vstack([X[:150], np.random.default_rng(2).random((50, N_FEATURES))])
+
+    shared = explainer.shap_values(rows)
+    monkeypatch.setattr(explain, 'PATTERN_LEAF_BLOCK', 7)
+    monkeypatch.setattr(explain, 'PATTERN_CHUNK_ELEMENTS', 50)
+    blocked = explainer.shap_values(rows)
+    monkeypatch.setattr(explain, 'PATTERN_MIN_ROWS', 10 ** 9)
+    dense = explainer.shap_values(rows)
+
+    np.testing.assert_allclose(shared, dense, atol=1e-12)
+    np.testing.assert_allclose(blocked, dense, atol=1e-12)
+
+def test_non_tree_models_unsupported(training_data):
+    """Test that non-tree models have no explainer"""
+    X, y = training_data
+    model = LinearRegression().fit(X, y)
+
+    assert build_explainer(model) is None
+    with pytest.raises(TypeError):
+        TreeExplainer(model)
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,313 @@
+"""
+Unit tests for the motor-affinity router
+Run with: pytest test_router.py
+"""
+
+import json
+import shutil
+import socket
+import subprocess
+import sys
+import os
+import threading
+import time
+import urllib.request
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import router
+from router import HashRing
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SAMPLE = {
+    'ambient': 25.5,
+    'coolant': 22.3,
+    'u_d': 0.45,
+    'u_q': 0.38,
+    'motor_speed': 1500,
+    'i_d': 12.5,
+    'i_q': 15.2
+}
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_backends(n, model_dir=BACKEND_DIR):
+    """
+    Start n app.py processes, each with its own model, caches and drift monitor
+    The model, scaler and drift reference are loaded from model_dir
+    """
+    ports = [free_port() for _ in range(n)]
+    processes = [
+        subprocess.Popen([sys.executable, os.path.join(BACKEND_DIR, 'app.py')], cwd=model_dir,
+                         env=dict(os.environ, HOST='127.0.0.1', PORT=str(port), FLASK_DEBUG='0'),
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        for port in ports
+    ]
+    urls = [f'http://127.0.0.1:{port}' for port in ports]
+    for url in urls:
+        for _ in range(300):
+            try:
+                urllib.request.urlopen(f'{url}/health', timeout=1)
+                break
+            except OSError:
+                time.sleep(0.1)
+    return processes, urls
+
+def stop_backends(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.wait()
+
+class SlowBackend(BaseHTTPRequestHandler):
+    """Backend that answers /health at once but takes 2 s over every POST"""
+    posts = 0
+
+    def do_GET(self):
+        self._reply({'status': 'healthy', 'model_loaded': True})
+
+    def do_POST(self):
+        SlowBackend.posts += 1
+        self.rfile.read(int(self.headers['Content-Length']))
+        time.sleep(2)
+        self._reply({'success': True})
+
+    def _reply(self, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture(scope='module')
+def tree_model_dir(tmp_path_factory):
+    """Directory with the repo's scaler and drift reference and a small Random Forest"""
+    model_dir = tmp_path_factory.mktemp('tree-model')
+    for name in ('transform.save', 'reference.save'):
+        shutil.copy(os.path.join(BACKEND_DIR, name), model_dir / name)
+
+    rng = np.random.default_rng(42)
+    X = rng.random((500, 7))
+    y = 40 + 30 * X[:, 0] + 50 * X[:, 4] * X[:, 6] + rng.normal(0, 1, 500)
+    model = RandomForestRegressor(n_estimators=10, max_depth=6, random_state=42).fit(X, y)
+    joblib.dump(model, model_dir / 'model.save')
+    return str(model_dir)
+
+@pytest.fixture(scope='module')
+def backends(tree_model_dir):
+    """Three app.py processes serving a tree model, standing in for backend nodes"""
+    processes, urls = start_backends(3, tree_model_dir)
+    yield urls
+    stop_backends(processes)
+
+@pytest.fixture
+def client(backends):
+    """Router test client in front of the backend processes"""
+    router.pool.set_backends(backends)
+    router.app.config['TESTING'] = True
+    with router.app.test_client() as client:
+        yield client
+
+def test_ring_is_balanced_and_deterministic():
+    """Test that keys spread evenly and always map to the same node"""
+    ring = HashRing([f'node-{i}' for i in range(4)])
+    owners = [ring.get(f'motor-{k}') for k in range(10000)]
+
+    assert owners == [ring.get(f'motor-{k}') for k in range(10000)]
+    for node in ring.nodes:
+        assert 0.15 < owners.count(node) / len(owners) < 0.35
+
+def test_ring_minimal_key_movement():
+    """Test that membership changes only move keys of the affected node"""
+    keys = [f'motor-{k}' for k in range(10000)]
+    ring = HashRing([f'node-{i}' for i in range(4)])
+    before = {key: ring.get(key) for key in keys}
+
+    ring.add('node-4')
+    after_add = {key: ring.get(key) for key in keys}
+    moved = [key for key in keys if before[key] != after_add[key]]
+    assert all(after_add[key] == 'node-4' for key in moved)
+    assert len(moved) / len(keys) < 0.3
+
+    ring.remove('node-4')
+    ring.remove('node-0')
+    after_remove = {key: ring.get(key) for key in keys}
+    moved = [key for key in keys if before[key] != after_remove[key]]
+    assert all(before[key] == 'node-0' for key in moved)
+
+def test_batch_fan_out_preserves_order(client):
+    """Test that sharded batch predictions come back in request order"""
+    samples = [dict(SAMPLE, motor_id=f'motor-{i}', motor_speed=100 * i) for i in range(30)]
+
+    response = client.post('/batch-predict', json={'samples': samples})
+    assert response.status_code == 200
+
+    data = json.loads(response.data)
+    assert data['total_samples'] == 30
+    assert len(data['shards']) > 1
+    assert [p['sample_index'] for p in data['predictions']] == list(range(30))
+
+    for i in (0, 17, 29):
+        single = json.loads(client.post('/predict', json=samples[i]).data)
+        assert data['predictions'][i]['prediction'] == single['prediction']
+
+def test_motor_affinity_keeps_backend_state_local(client):
+    """Test that a motor's requests, and so its drift counts, stay on one backend"""
+    before = json.loads(client.get('/drift').data)['backends']
+
+    owners = {
+        client.post('/predict', json=dict(SAMPLE, motor_id='motor-42')).headers['X-Backend']
+        for _ in range(5)
+    }
+    assert len(owners) == 1
+    owner = owners.pop()
+
+    after = json.loads(client.get('/drift').data)['backends']
+    for backend, report in after.items():
+        added = report['window_samples'] - before[backend]['window_samples']
+        assert added == (5 if backend == owner else 0)
+
+def test_passthrough_endpoints(client):
+    """Test that /explain, /sweep and /model-info are served through the router"""
+    response = client.post('/explain', json=dict(SAMPLE, motor_id='motor-7'))
+    assert response.status_code == 200
+    assert response.headers['X-Backend'] == router.pool.route('motor-7')
+
+    batch = [dict(SAMPLE, motor_id=f'motor-{i}', motor_speed=300 * i) for i in range(10)]
+    response = client.post('/explain', json={'samples': batch})
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert len(data['shards']) > 1
+    assert [e['sample_index'] for e in data['explanations']] == list(range(10))
+
+    # The merged batch matches explaining each sample on its own
+    for sample, explanation in zip(batch, data['explanations']):
+        single = json.loads(client.post('/explain', json=sample).data)
+        assert explanation['prediction'] == pytest.approx(single['prediction'], abs=1e-4)
+        assert explanation['contributions'] == pytest.approx(single['contributions'], abs=1e-5)
+        assert data['base_value'] == single['base_value']
+
+    sweep = {
+        'base': SAMPLE,
+        'axes': [{'feature': 'motor_speed', 'start': 0, 'stop': 3000, 'steps': 50}],
+        'format': 'json'
+    }
+    first = client.post('/sweep', json=sweep, headers={'Accept-Encoding': 'gzip'})
+    second = client.post('/sweep', json=sweep, headers={'Accept-Encoding': 'gzip'})
+    assert first.headers['X-Backend'] == second.headers['X-Backend']
+    assert second.headers['X-Sweep-Cache'] == 'hit'
+    assert second.headers['Content-Encoding'] == 'gzip'
+
+    assert json.loads(client.get('/model-info').data)['success'] is True
+
+def test_invalid_payloads_return_json(client):
+    """Test that malformed bodies get JSON errors, not HTML pages"""
+    response = client.post('/predict', json=[1, 2, 3])
+    assert response.status_code == 400
+    assert json.loads(response.data)['success'] is False
+
+    response = client.post('/batch-predict', json={'samples': []})
+    assert response.status_code == 400
+
+def test_invalid_sample_fails_like_a_single_backend(client, backends):
+    """Test that an unparsable sample fails the whole batch with the backend's own error"""
+    samples = [dict(SAMPLE, motor_id=f'motor-{i}') for i in range(10)]
+    samples[3]['ambient'] = 'abc'
+
+    for path in ('/batch-predict', '/explain'):
+        status, expected = router.pool.send(backends[0], 'POST', path, {'samples': samples})
+        response = client.post(path, json={'samples': samples})
+        data = json.loads(response.data)
+        assert response.status_code == status and status in (400, 500)
+        assert (data['error'], data['message']) == (expected['error'], expected['message'])
+
+    # Missing fields are reported against the request's own sample numbering
+    del samples[3]['ambient']
+    response = client.post('/explain', json={'samples': samples})
+    assert response.status_code == 400
+    assert json.loads(response.data)['sample_index'] == 3
+
+    response = client.post('/batch-predict', json={'samples': samples})
+    assert response.status_code == 200
+    predictions = json.loads(response.data)['predictions']
+    assert [p['success'] for p in predictions] == [i != 3 for i in range(10)]
+
+def test_timeout_returns_504_and_keeps_backend(monkeypatch):
+    """Test that a slow backend gets a 504, no retried POST, and stays in the ring"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SlowBackend)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}'
+    try:
+        monkeypatch.setattr(router.pool, 'timeout', 0.5)
+        router.pool.set_backends([url])
+        SlowBackend.posts = 0
+
+        with router.app.test_client() as client:
+            response = client.post('/predict', json=SAMPLE)
+            assert response.status_code == 504
+            assert json.loads(response.data)['error'] == 'Backend timed out'
+
+            response = client.post('/batch-predict', json={'samples': [SAMPLE] * 3})
+            assert response.status_code == 504
+
+        assert SlowBackend.posts == 2
+        assert router.pool.ring.nodes == [url]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_health_checks_start_on_import():
+    """Test that importing the router (as a WSGI server does) starts backend probing"""
+    assert 'router-health' in [thread.name for thread in threading.enumerate()]
+
+def test_failover_reroutes_each_motor():
+    """Test that a dead backend's motors move to their new owners, the rest stay put"""
+    processes, urls = start_backends(3)
+    try:
+        router.pool.set_backends(urls)
+        router.app.config['TESTING'] = True
+        samples = [dict(SAMPLE, motor_id=f'motor-{i}') for i in range(60)]
+        owners_before = {s['motor_id']: router.pool.route(s['motor_id']) for s in samples}
+
+        dead = urls[0]
+        processes[0].terminate()
+        processes[0].wait()
+
+        with router.app.test_client() as client:
+            response = client.post('/batch-predict', json={'samples': samples})
+            data = json.loads(response.data)
+            assert response.status_code == 200
+            assert all(p['success'] for p in data['predictions'])
+
+            # The dead node's samples were spread over the survivors by ring ownership
+            owners_after = {s['motor_id']: router.pool.route(s['motor_id']) for s in samples}
+            assert data['shards'] == dict(Counter(owners_after.values()))
+            assert all(owners_after[m] == owner for m, owner in owners_before.items() if owner != dead)
+            assert len({owners_after[m] for m, owner in owners_before.items() if owner == dead}) > 1
+
+            router.pool.check_health()
+            health = json.loads(client.get('/health').data)
+            assert health['healthy_backends'] == 2
+            assert [b['healthy'] for b in health['backends']] == [False, True, True]
+    finally:
+        stop_backends(processes)
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])